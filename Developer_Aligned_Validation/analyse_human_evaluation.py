@@ -3,14 +3,17 @@ import pandas as pd
 import numpy as np
 import os
 
+from annotation_consolidation import majority_labels
+from workbook_cache import read_excel
+
 SRC_XLSX = "consolidated_annotations_clean.xlsx"
 SRC_CSV  = "consolidated_annotations_clean.csv"
 OUT_XLSX = "mae_fn_simple.xlsx"
 
 def load_consolidated():
     if os.path.exists(SRC_XLSX):
-        # Read all sheets and choose intelligently
-        sheets = pd.read_excel(SRC_XLSX, sheet_name=None)
+        # Read all sheets (parsed once, then served from .workbook_cache) and choose intelligently
+        sheets = read_excel(SRC_XLSX, sheet_name=None)
         if "Consolidated" in sheets:
             df = sheets["Consolidated"]
             used = "Excel:Consolidated"
@@ -29,30 +32,6 @@ def load_consolidated():
 def to_float(series):
     return pd.to_numeric(series, errors="coerce").astype(float)
 
-def normalize_yes_no(s):
-    if pd.isna(s):
-        return np.nan
-    s = str(s).strip().lower()
-    if s in ["yes", "oui", "y", "1", "true"]:
-        return "Yes"
-    if s in ["no", "non", "n", "0", "false"]:
-        return "No"
-    return np.nan
-
-def majority_vote_yes_no(row, cols):
-    vals = [normalize_yes_no(row[c]) for c in cols if c in row.index]
-    vals = [v for v in vals if v in ["Yes", "No"]]
-    if not vals:
-        return np.nan
-    yes = sum(v == "Yes" for v in vals)
-    no  = sum(v == "No"  for v in vals)
-    if yes > no:
-        return "Yes"
-    if no > yes:
-        return "No"
-    # Tie case -> default to No for safety
-    return "No"
-
 def main():
     df, used_src = load_consolidated()
 
@@ -76,7 +55,7 @@ def main():
     else:
         vote_cols = [c for c in df.columns if c.startswith("Clarity_Improved_")]
         if len(vote_cols) >= 2:
-            df["Clarity_Majority"] = df.apply(lambda r: majority_vote_yes_no(r, vote_cols), axis=1)
+            df["Clarity_Majority"] = majority_labels(df, vote_cols)
             y_col = "Clarity_Majority"
             label_source = f"majority({','.join(vote_cols)})"
         elif "Clarity_Improved_A" in df.columns:
@@ -0,0 +1,141 @@
+import re
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbook_cache import read_excel
+
+# === Configuration ===
+ID_COL = "key"
+# Criterion -> prefix of its per-annotator column (e.g. Clarity_Improved_A)
+CRITERIA = {"Clarity": "Clarity_Improved", "Behavior": "Behavior_Preserved"}
+COMMENT = "Comment"
+ANNOTATOR_COLUMN = re.compile(rf"^(?:{'|'.join(CRITERIA.values())}|{COMMENT})_(\w+)$")
+# Accepted spellings of a yes / no answer, after strip + lower
+LABELS = {
+    "yes": 1, "oui": 1, "y": 1, "1": 1, "1.0": 1, "true": 1,
+    "no": 0, "non": 0, "n": 0, "0": 0, "0.0": 0, "false": 0
+}
+YES_NO = np.array(["No", "Yes"], dtype=object)
+
+# === Loading ===
+def annotator_of(df):
+    """Annotator suffix of a developer file, from its Clarity_Improved_<X> / ... columns."""
+    suffixes = {match.group(1) for match in map(ANNOTATOR_COLUMN.match, df.columns) if match}
+    if len(suffixes) != 1:
+        raise ValueError(f"Expected the columns of exactly one annotator, found {sorted(suffixes) or 'none'}")
+    return suffixes.pop()
+
+def read_table(path):
+    path = Path(path)
+    return pd.read_csv(path) if path.suffix == ".csv" else read_excel(path)
+
+def consolidate(frames):
+    """One row per key with the shared metadata and the columns of every annotator, side by side.
+
+    Metadata comes from the first file that has the key; annotator columns are
+    aligned on the key in one concat instead of one merge per annotator. Rows are
+    sorted by key, as an outer merge would.
+    """
+    annotators = [annotator_of(df) for df in frames]
+    if len(set(annotators)) != len(annotators):
+        raise ValueError(f"Duplicate annotators: {annotators}")
+    frames = [df.drop_duplicates(subset=[ID_COL], keep="first").set_index(ID_COL) for df in frames]
+    own = [[c for c in df.columns if ANNOTATOR_COLUMN.match(c)] for df in frames]
+    metadata = pd.concat([df.drop(columns=cols) for df, cols in zip(frames, own)])
+    metadata = metadata[~metadata.index.duplicated(keep="first")]
+    merged = pd.concat([metadata] + [df[cols] for df, cols in zip(frames, own)], axis=1, join="outer")
+    return merged.sort_index().reset_index(names=ID_COL), annotators
+
+# === Labels ===
+def normalize_labels(frame):
+    """Rows x annotators matrix of 1 (Yes), 0 (No) or NaN (missing / unrecognized answer)."""
+    codes = frame.apply(lambda column: column.astype("string").str.strip().str.lower().map(LABELS))
+    return codes.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def majority(votes):
+    """Majority label of every row (1 / 0 / NaN when nobody answered), ties counting as No.
+
+    Also returns the Yes and No counts and whether the answers given are unanimous.
+    """
+    yes = (votes == 1).sum(axis=1)
+    no = (votes == 0).sum(axis=1)
+    label = np.where(yes + no == 0, np.nan, (yes > no).astype(np.float64))
+    return label, yes, no, (yes == 0) | (no == 0)
+
+def to_yes_no(label, index):
+    labels = pd.Series(np.nan, index=index, dtype=object)
+    answered = ~np.isnan(label)
+    labels[answered] = YES_NO[label[answered].astype(np.int64)]
+    return labels
+
+def majority_labels(df, columns):
+    """"Yes" / "No" / NaN majority vote over the given annotator columns of df."""
+    label, _, _, _ = majority(normalize_labels(df[columns]))
+    return to_yes_no(label, df.index)
+
+# === Agreement ===
+def kappa(observed, expected):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected < 1, (observed - expected) / (1 - expected), np.nan)
+
+def fleiss_kappa(votes):
+    """Fleiss' kappa of binary votes (rows x annotators, NaN = missing) over the rows rated at least twice.
+
+    Rows may have different numbers of ratings. NaN when every rating falls in one
+    category: chance agreement is then 1 and kappa is undefined.
+    """
+    counts = np.column_stack([(votes == 0).sum(axis=1), (votes == 1).sum(axis=1)]).astype(np.float64)
+    raters = counts.sum(axis=1)
+    counts, raters = counts[raters >= 2], raters[raters >= 2]
+    if not len(raters):
+        return np.nan, 0, np.nan
+    observed = ((counts ** 2).sum(axis=1) - raters) / (raters * (raters - 1))
+    shares = counts.sum(axis=0) / raters.sum()
+    return float(kappa(observed.mean(), (shares ** 2).sum())), len(raters), float(observed.mean())
+
+def cohen_kappa_matrix(votes):
+    """Cohen's kappa, items rated by both and observed agreement of every pair of annotators.
+
+    With R (rated), Y (Yes) and N (No) as 0/1 matrices, every pairwise count is one
+    matrix product: items rated by both R'R, agreements Y'Y + N'N, and each
+    annotator's Yes / No marginals on the shared items Y'R and N'R.
+    """
+    rated = ~np.isnan(votes)
+    yes = (votes == 1).astype(np.float64)
+    no = (votes == 0).astype(np.float64)
+    rated = rated.astype(np.float64)
+    both = rated.T @ rated
+    yes_on_shared = yes.T @ rated
+    no_on_shared = no.T @ rated
+    with np.errstate(divide="ignore", invalid="ignore"):
+        observed = (yes.T @ yes + no.T @ no) / both
+        expected = (yes_on_shared * yes_on_shared.T + no_on_shared * no_on_shared.T) / both ** 2
+    return kappa(observed, expected), both.astype(np.int64), observed
+
+def agreement_report(df, annotators, criteria=CRITERIA):
+    """Fleiss' kappa over all annotators and Cohen's kappa of every pair, per criterion."""
+    rows = []
+    for criterion, prefix in criteria.items():
+        columns = [f"{prefix}_{annotator}" for annotator in annotators]
+        votes = normalize_labels(df[columns])
+        value, items, observed = fleiss_kappa(votes)
+        rows.append({"Criterion": criterion, "Statistic": "Fleiss kappa", "Annotators": ",".join(annotators),
+                     "Items": items, "Observed agreement": observed, "Kappa": value})
+        pairwise, both, agreement = cohen_kappa_matrix(votes)
+        for i, j in combinations(range(len(annotators)), 2):
+            rows.append({"Criterion": criterion, "Statistic": "Cohen kappa",
+                         "Annotators": f"{annotators[i]}-{annotators[j]}", "Items": int(both[i, j]),
+                         "Observed agreement": agreement[i, j], "Kappa": pairwise[i, j]})
+    return pd.DataFrame(rows)
+
+def add_consensus(df, annotators, criteria=CRITERIA):
+    """Adds <Criterion>_Consensus (majority, ties = No) and <Criterion>_Unanimous columns."""
+    df = df.copy()
+    for criterion, prefix in criteria.items():
+        label, _, _, unanimous = majority(normalize_labels(df[[f"{prefix}_{a}" for a in annotators]]))
+        df[f"{criterion}_Consensus"] = to_yes_no(label, df.index)
+        df[f"{criterion}_Unanimous"] = unanimous & ~np.isnan(label)
+    return df
@@ -0,0 +1,109 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from ctses_weight_search import load_annotations, simplex_grid, evaluate, WEIGHT_NAMES, THRESHOLD
+
+# === Configuration ===
+FOLDS = 5
+REPEATS = 20
+SEED = 42
+# Grid used to warm-start the optimizer on each training fold
+WARM_START_STEP = 0.05
+OUT_FOLDS = "ctses_weight_cv_folds.csv"
+
+# === Folds ===
+def repeated_folds(y_true, folds=FOLDS, repeats=REPEATS, seed=SEED):
+    """(repeat, fold, train index, test index) of repeated k-fold CV, stratified on the labels."""
+    rng = np.random.default_rng(seed)
+    splits = []
+    for repeat in range(repeats):
+        assignment = np.empty(len(y_true), dtype=np.int64)
+        # Deal each class out over the folds in a random order, so every fold keeps the label balance
+        offset = 0
+        for label in np.unique(y_true):
+            members = rng.permutation(np.flatnonzero(y_true == label))
+            assignment[members] = (offset + np.arange(len(members))) % folds
+            offset += len(members)
+        for fold in range(folds):
+            test = np.flatnonzero(assignment == fold)
+            if len(test):
+                splits.append((repeat, fold, np.flatnonzero(assignment != fold), test))
+    return splits
+
+# === Fitting ===
+def mae_objective(weights, metrics, y_true):
+    scores = weights @ metrics
+    residual = scores - y_true
+    return np.abs(residual).mean(), (np.sign(residual) * metrics).mean(axis=1)
+
+def fit_weights(metrics, y_true, step=WARM_START_STEP):
+    """Weights on the simplex minimizing MAE: best grid point, refined with SLSQP."""
+    grid = simplex_grid(step)
+    mae, fn, _ = evaluate(grid, metrics, y_true)
+    start = grid[np.lexsort((fn, mae))[0]]
+    result = minimize(mae_objective, start, args=(metrics, y_true), jac=True, method="SLSQP",
+                      bounds=[(0.0, 1.0)] * len(start),
+                      constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1.0, "jac": lambda w: np.ones_like(w)}])
+    weights = np.clip(result.x, 0.0, 1.0)
+    weights /= weights.sum()
+    # Keep the grid point if the optimizer did not improve on it
+    if mae_objective(weights, metrics, y_true)[0] > mae_objective(start, metrics, y_true)[0]:
+        weights = start
+    return weights, start
+
+def run_fold(task):
+    repeat, fold, train, test, metrics, y_true, threshold = task
+    weights, start = fit_weights(metrics[:, train], y_true[train])
+    train_mae, _, _ = evaluate(weights[None, :], metrics[:, train], y_true[train], threshold)
+    test_mae, test_fn, _ = evaluate(weights[None, :], metrics[:, test], y_true[test], threshold)
+    return {
+        "repeat": repeat, "fold": fold, "n_train": len(train), "n_test": len(test),
+        **{name: round(float(w), 4) for name, w in zip(WEIGHT_NAMES, weights)},
+        **{f"{name}_start": round(float(w), 4) for name, w in zip(WEIGHT_NAMES, start)},
+        "train_MAE": round(float(train_mae[0]), 4),
+        "test_MAE": round(float(test_mae[0]), 4),
+        f"test_FN@{threshold}": int(test_fn[0])
+    }
+
+def cross_validate(metrics, y_true, folds=FOLDS, repeats=REPEATS, seed=SEED, threshold=THRESHOLD, workers=None):
+    """Fit and evaluate the weights on every fold of every repeat, folds running in parallel."""
+    tasks = [(repeat, fold, train, test, metrics, y_true, threshold)
+             for repeat, fold, train, test in repeated_folds(y_true, folds, repeats, seed)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        rows = list(pool.map(run_fold, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count())))))
+    return pd.DataFrame(rows)
+
+# === Entry point ===
+def main():
+    parser = argparse.ArgumentParser(description="Repeated k-fold cross-validation of the CTSES weights.")
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    _, metrics, y_true = load_annotations()
+    folds = min(args.folds, len(y_true))
+    results = cross_validate(metrics, y_true, folds, args.repeats, args.seed, args.threshold, args.workers)
+    results.to_csv(OUT_FOLDS, index=False)
+
+    fn_column = f"test_FN@{args.threshold}"
+    print(f"{args.repeats} x {folds}-fold CV over {len(y_true)} annotated rows ({len(results)} fits)")
+    print("Held-out MAE :", results["test_MAE"].describe(percentiles=[0.25, 0.5, 0.75]).round(4).to_dict())
+    print(f"Held-out FN@{args.threshold} per fold:", results[fn_column].value_counts().sort_index().to_dict())
+    print("Fitted weights (mean +/- std):",
+          {name: f"{results[name].mean():.3f} +/- {results[name].std():.3f}" for name in WEIGHT_NAMES})
+
+    weights, _ = fit_weights(metrics, y_true)
+    mae, fn, _ = evaluate(weights[None, :], metrics, y_true, args.threshold)
+    print(f"Fit on all rows: { {name: round(float(w), 4) for name, w in zip(WEIGHT_NAMES, weights)} } MAE={mae[0]:.4f} FN={fn[0]}")
+    print(f"Saved: {OUT_FOLDS}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from analyse_human_evaluation import load_consolidated, to_float
+from annotation_consolidation import majority_labels
+
+# === Configuration ===
+BASE_METRICS = ["CodeBLEU", "METEOR", "ROUGE-L"]
+WEIGHT_NAMES = ["alpha", "beta", "gamma"]
+THRESHOLD = 0.5
+TOP_K = 10
+
+# === Annotations ===
+def load_annotations():
+    """Keys, base metric matrix (3 x rows) and 0/1 clarity labels of the consolidated annotations.
+
+    Labels are Clarity_Consensus when present, otherwise the majority vote of the
+    Clarity_Improved_* columns (ties count as No), as in analyse_human_evaluation.py.
+    """
+    df, _ = load_consolidated()
+    df = df.drop_duplicates(subset=["key"], keep="first").reset_index(drop=True)
+    if "Clarity_Consensus" in df.columns:
+        labels = df["Clarity_Consensus"]
+    else:
+        vote_cols = [c for c in df.columns if c.startswith("Clarity_Improved_")]
+        labels = majority_labels(df, vote_cols)
+    y_true = labels.map({"Yes": 1, "No": 0}).astype(float).to_numpy()
+    metrics = np.vstack([to_float(df[metric]).to_numpy() for metric in BASE_METRICS])
+    keep = ~np.isnan(y_true) & ~np.isnan(metrics).any(axis=0)
+    return df["key"].astype(str).to_numpy()[keep], metrics[:, keep], y_true[keep]
+
+# === Search ===
+def simplex_grid(step):
+    """Every (alpha, beta, gamma) on the simplex with the given step, e.g. 5,151 points for 0.01."""
+    resolution = int(round(1 / step))
+    alpha, beta = np.nonzero(np.add.outer(np.arange(resolution + 1), np.arange(resolution + 1)) <= resolution)
+    return np.column_stack([alpha, beta, resolution - alpha - beta]) / resolution
+
+def evaluate(weights, metrics, y_true, threshold=THRESHOLD):
+    """MAE and FN@threshold of every weight configuration (configs x 3) over all rows at once."""
+    scores = weights @ metrics
+    mae = np.abs(scores - y_true).mean(axis=1)
+    false_negatives = (y_true == 1) & (scores < threshold)
+    return mae, false_negatives.sum(axis=1), scores
+
+def search(keys, metrics, y_true, step=0.1, threshold=THRESHOLD, top_k=TOP_K):
+    """All simplex configurations ranked by MAE then FN; FN keys are listed for the top_k only."""
+    weights = simplex_grid(step)
+    mae, fn, scores = evaluate(weights, metrics, y_true, threshold)
+    decimals = max(2, len(f"{step:g}".partition(".")[2]))
+    results = pd.DataFrame(np.round(weights, decimals), columns=WEIGHT_NAMES)
+    results["MAE"] = np.round(mae, 4)
+    results[f"FN@{threshold}"] = fn
+    order = np.lexsort((fn, results["MAE"].to_numpy()))
+    results = results.iloc[order].reset_index(drop=True)
+    top = order[:top_k]
+    fn_mask = (y_true == 1) & (scores[top] < threshold)
+    results["FN_Keys"] = ""
+    results.loc[:len(top) - 1, "FN_Keys"] = [",".join(keys[row]) for row in fn_mask]
+    return results
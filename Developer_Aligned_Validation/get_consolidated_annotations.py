@@ -1,21 +1,33 @@
-import pandas as pd
-
-# Load Excel files
-devA = pd.read_excel("DevA_annotations_clean_exact.xlsx")
-devB = pd.read_excel("DevB_annotations_clean_exact.xlsx")
-devC = pd.read_excel("DevC_annotations_clean_exact.xlsx")
-
-# Merge while keeping annotator-specific columns
-merged = devA.merge(
-    devB[["key", "Clarity_Improved_B", "Behavior_Preserved_B", "Comment_B"]],
-    on="key", how="outer"
-).merge(
-    devC[["key", "Clarity_Improved_C", "Behavior_Preserved_C", "Comment_C"]],
-    on="key", how="outer"
-)
+import glob
+import argparse
+
+from annotation_consolidation import read_table, consolidate, add_consensus, agreement_report
+
+DEFAULT_FILES = "Dev*_annotations_clean_exact.xlsx"
+OUT_XLSX = "consolidated_annotations_clean.xlsx"
+OUT_CSV = "consolidated_annotations_clean.csv"
+OUT_AGREEMENT = "annotator_agreement.csv"
+
+parser = argparse.ArgumentParser(description="Consolidate the annotations of any number of developers.")
+parser.add_argument("files", nargs="*", help=f"Annotator .xlsx / .csv files (default: {DEFAULT_FILES})")
+args = parser.parse_args()
+
+# Load Excel files (one per annotator, columns suffixed by the annotator letter)
+files = args.files or sorted(glob.glob(DEFAULT_FILES))
+frames = [read_table(path) for path in files]
+
+# Merge while keeping annotator-specific columns, then add the majority labels
+merged, annotators = consolidate(frames)
+merged = add_consensus(merged, annotators)
+
+# Agreement between annotators: Fleiss' kappa over all, Cohen's kappa per pair
+agreement = agreement_report(merged, annotators)
+print(f"{len(merged)} rows annotated by {len(annotators)} developers ({', '.join(annotators)})")
+print(agreement.to_string(index=False))
 
 # Save consolidated results
-merged.to_excel("consolidated_annotations_clean.xlsx", index=False)
-merged.to_csv("consolidated_annotations_clean.csv", index=False)
+merged.to_excel(OUT_XLSX, index=False)
+merged.to_csv(OUT_CSV, index=False)
+agreement.to_csv(OUT_AGREEMENT, index=False, float_format="%.4f")
 
-print("Consolidation completed: consolidated_annotations_clean.xlsx / .csv generated")
+print(f"Consolidation completed: {OUT_XLSX} / .csv and {OUT_AGREEMENT} generated")
@@ -0,0 +1,161 @@
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analyse_human_evaluation import load_consolidated, to_float
+from annotation_consolidation import CRITERIA, majority_labels
+from ctses_weight_search import BASE_METRICS, THRESHOLD
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Results"))
+from results_store import load_results, MODEL_ALIASES, MODEL_LABELS, SIMILARITY_METRICS, COSINE_METRICS
+
+# === Configuration ===
+ANNOTATION_METRICS = ["CodeBLEU", "AVG", "CTSES1", "CTSES2", "METEOR", "ROUGE-L"]
+# Columns of the results store joined in by pair key (CodeBLEU components and embedding similarities)
+STORE_METRICS = [m for m in SIMILARITY_METRICS if m not in ANNOTATION_METRICS] + COSINE_METRICS
+PAIR_KEY = ["Model", "Dataset", "project_name", "class", "bug-id", "iteration_evosuite", "iteration_refactored"]
+OUT_SUMMARY = "metric_evaluation_{criterion}_summary.csv"
+OUT_CURVES = "metric_evaluation_{criterion}_curves.csv"
+OUT_SWEEP = "metric_evaluation_{criterion}_sweep.csv"
+
+# === Data ===
+def join_store_metrics(df):
+    """Adds the STORE_METRICS of every annotated pair, matched on its pair key in the results store."""
+    store = load_results().to_frame(PAIR_KEY[2:] + STORE_METRICS)
+    keys = pd.DataFrame({
+        "Model": df["Model"].astype(str).str.split().str[0].str.upper().map(MODEL_ALIASES).map(MODEL_LABELS),
+        "Dataset": df["Dataset"].astype(str),
+        "project_name": df["Project"].astype(str),
+        "class": df["Class"].astype(str),
+        # The store keeps bug ids as text, empty for SF110
+        "bug-id": pd.to_numeric(df["BugID"], errors="coerce").astype("Int64").astype("string").fillna(""),
+        "iteration_evosuite": df["iteration_evosuite"].astype(str),
+        "iteration_refactored": df["iteration_refactored"].astype(str)
+    }, index=df.index)
+    joined = keys.merge(store.drop_duplicates(subset=PAIR_KEY), on=PAIR_KEY, how="left")
+    return pd.concat([df, joined[STORE_METRICS].set_axis(df.index)], axis=1)
+
+def load_scores(criterion="Clarity", weights=()):
+    """Keys, 0/1 labels of the criterion and one score column per metric of the annotated rows.
+
+    `weights` adds one CTSES column per (alpha, beta, gamma) over CodeBLEU, METEOR and ROUGE-L.
+    """
+    df, _ = load_consolidated()
+    df = df.drop_duplicates(subset=["key"], keep="first").reset_index(drop=True)
+    if f"{criterion}_Consensus" in df.columns:
+        labels = df[f"{criterion}_Consensus"]
+    else:
+        labels = majority_labels(df, [c for c in df.columns if c.startswith(f"{CRITERIA[criterion]}_")])
+    y_true = labels.map({"Yes": 1, "No": 0}).astype(float).to_numpy()
+    df = join_store_metrics(df)
+    scores = pd.DataFrame({metric: to_float(df[metric]) for metric in ANNOTATION_METRICS + STORE_METRICS})
+    base = np.vstack([to_float(df[metric]).to_numpy() for metric in BASE_METRICS])
+    for w in weights:
+        scores[f"CTSES({w[0]:g},{w[1]:g},{w[2]:g})"] = np.asarray(w) @ base
+    keep = ~np.isnan(y_true)
+    return df["key"].astype(str).to_numpy()[keep], y_true[keep], scores[keep].reset_index(drop=True)
+
+# === Sweeps ===
+def sweep(scores, y_true):
+    """Confusion counts at every distinct score, predicting Yes when score >= threshold.
+
+    Scores are sorted once in decreasing order. The cumulative sums of the labels
+    then give TP and FP for every cut at the same time; thresholds are the last
+    position of each run of equal scores. NaN scores are left out.
+    """
+    present = ~np.isnan(scores)
+    scores, y_true = scores[present], y_true[present]
+    order = np.argsort(-scores, kind="stable")
+    scores, y_true = scores[order], y_true[order]
+    last = np.flatnonzero(np.r_[scores[1:] != scores[:-1], True])
+    tp = np.cumsum(y_true)[last]
+    fp = (last + 1) - tp
+    positives, negatives = y_true.sum(), len(y_true) - y_true.sum()
+    return {"thresholds": scores[last], "sorted": scores, "cum_pos": np.r_[0, np.cumsum(y_true)],
+            "tp": tp, "fp": fp, "positives": positives, "negatives": negatives}
+
+def rates(tp, fp, positives, negatives):
+    tp, fp = np.asarray(tp, dtype=np.float64), np.asarray(fp, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "TP": tp, "FP": fp, "FN": positives - tp, "TN": negatives - fp,
+            "Precision": tp / (tp + fp), "Recall": tp / positives, "FPR": fp / negatives,
+            "F1": 2 * tp / (tp + fp + positives)
+        }
+
+def counts_at(curve, thresholds):
+    """TP and FP at arbitrary thresholds by binary search in the sorted scores."""
+    ascending = curve["sorted"][::-1]
+    predicted = len(ascending) - np.searchsorted(ascending, thresholds, side="left")
+    tp = curve["cum_pos"][predicted]
+    return tp, predicted - tp
+
+def areas(curve):
+    """ROC AUC (trapezoids) and average precision (step-wise, as in scikit-learn); NaN if one class is absent."""
+    r = rates(curve["tp"], curve["fp"], curve["positives"], curve["negatives"])
+    tpr, fpr = np.r_[0, r["Recall"]], np.r_[0, r["FPR"]]
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)) if curve["negatives"] else np.nan
+    ap = float(np.sum(np.diff(tpr) * r["Precision"])) if curve["positives"] else np.nan
+    return auc, ap
+
+def evaluate(scores, y_true, threshold=THRESHOLD, grid=None):
+    """Summary at the threshold, full ROC / PR curves and an optional fixed-grid sweep of every metric."""
+    summary, curves, sweeps = [], [], []
+    for metric in scores.columns:
+        values = scores[metric].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        curve = sweep(values, y_true)
+        auc, ap = areas(curve)
+        at = rates(*counts_at(curve, [threshold]), curve["positives"], curve["negatives"])
+        full = rates(curve["tp"], curve["fp"], curve["positives"], curve["negatives"])
+        best = int(np.nanargmax(full["F1"])) if len(curve["tp"]) and curve["positives"] else None
+        summary.append({
+            "Metric": metric, "N": int(present.sum()), "Positives": int(curve["positives"]),
+            "MAE": float(np.abs(values[present] - y_true[present]).mean()) if present.any() else np.nan,
+            **{f"{name}@{threshold}": float(value[0]) for name, value in at.items()},
+            "ROC_AUC": auc, "Average_Precision": ap,
+            "Best_F1": float(full["F1"][best]) if best is not None else np.nan,
+            "Best_F1_Threshold": float(curve["thresholds"][best]) if best is not None else np.nan
+        })
+        curves.append(pd.DataFrame({"Metric": metric, "Threshold": curve["thresholds"], **full}))
+        if grid is not None:
+            sweeps.append(pd.DataFrame({"Metric": metric, "Threshold": grid,
+                                        **rates(*counts_at(curve, grid), curve["positives"], curve["negatives"])}))
+    summary = pd.DataFrame(summary).sort_values(["MAE", f"FN@{threshold}"]).reset_index(drop=True)
+    return summary, pd.concat(curves, ignore_index=True), pd.concat(sweeps, ignore_index=True) if sweeps else None
+
+# === Entry point ===
+def parse_weights(text):
+    weights = tuple(float(w) for w in text.split(","))
+    if len(weights) != 3 or abs(sum(weights) - 1) > 1e-9:
+        raise argparse.ArgumentTypeError(f"expected alpha,beta,gamma summing to 1, got {text!r}")
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description="Threshold sweeps, ROC and PR curves of every metric against the annotations.")
+    parser.add_argument("--criterion", choices=list(CRITERIA), default="Clarity")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--weights", type=parse_weights, action="append", default=[],
+                        help="Extra CTSES configuration alpha,beta,gamma (repeatable), e.g. 0.4,0.4,0.2")
+    parser.add_argument("--grid", type=float, default=None, help="Also sweep thresholds 0..1 with this step")
+    args = parser.parse_args()
+
+    _, y_true, scores = load_scores(args.criterion, args.weights)
+    grid = None if args.grid is None else np.round(np.arange(0, 1 + args.grid / 2, args.grid), 10)
+    summary, curves, sweeps = evaluate(scores, y_true, args.threshold, grid)
+
+    print(f"{args.criterion}: {len(y_true)} annotated rows, {int(y_true.sum())} Yes, {scores.shape[1]} metrics")
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(summary[["Metric", "N", "MAE", f"FN@{args.threshold}", f"FP@{args.threshold}",
+                       f"Recall@{args.threshold}", "ROC_AUC", "Average_Precision", "Best_F1_Threshold"]].round(4))
+
+    outputs = [(OUT_SUMMARY, summary), (OUT_CURVES, curves)] + ([(OUT_SWEEP, sweeps)] if sweeps is not None else [])
+    for template, frame in outputs:
+        frame.to_csv(template.format(criterion=args.criterion.lower()), index=False, float_format="%.4f")
+        print(f"Saved: {template.format(criterion=args.criterion.lower())}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import json
 import os
+import sys
+import argparse
+from pathlib import Path
 import pandas as pd
 
+from stratified_sampler import stratified_sample, ALLOCATIONS, BINNED, SEED
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "LLM-Refactored-Test-Suite" / "Refactored-Test-Suite-Code"))
+from corpus import open_corpus, PAIR_KEY
+
 # ============================
 # Paths & configuration
 # ============================
@@ -21,53 +29,86 @@ DELTA_HIGH_RELAX = 0.10
 DELTA_LOW_RELAX = -0.10
 DELTA_MID_RELAX = 0.10
 
+JOIN_KEYS = ["project_name", "class", "iteration_evosuite", "iteration_refactored"]
+SCORE_COLUMNS = {
+    "CodeBLEU": "CodeBLEU",
+    "METEOR": "METEOR",
+    "ROUGE-L": "ROUGE-L",
+    "average_score_1": "AVG",       # Uniform average
+    "CTSES_score_1": "CTSES1",      # Semantic-prioritized (0.5 / 0.3 / 0.2)
+    "CTSES_score_2": "CTSES2"       # Readability-aware (0.4 / 0.3 / 0.3)
+}
+
 
 # ============================
 # Data loading & merging
 # ============================
+def load_pairs(pairs_file):
+    """Indexed corpus of a *-test-pairs.json file; the test sources stay on disk until fetched by key."""
+    return open_corpus(Path(pairs_file).with_suffix(".corpus"), [pairs_file], PAIR_KEY)
+
 def load_and_merge(model, dataset):
+    """Identifiers and scores of the metric records that have a test pair; no test source is read here."""
     base_path = os.path.join(BASE_DIR, model)
 
     metrics_file = os.path.join(base_path, f"UPDATED_{dataset}-Scenario-1-metrics.json")
     pairs_file = os.path.join(base_path, f"{dataset}-Scenario-1-test-pairs.json")
 
     with open(metrics_file, "r") as f:
-        metrics_data = json.load(f)
-    with open(pairs_file, "r") as f:
-        pairs_data = json.load(f)
-
-    pairs_index = {
-        (p["project_name"], p["class"], p["iteration_evosuite"], p["iteration_refactored"]): p
-        for p in pairs_data
-    }
-
-    merged = []
-    for m in metrics_data:
-        key = (m["project_name"], m["class"], m["iteration_evosuite"], m["iteration_refactored"])
-        if key in pairs_index:
-            p = pairs_index[key]
-            merged.append({
-                "model": model,
-                "dataset": dataset,
-                "project_name": m["project_name"],
-                "class": m["class"],
-                "bug_id": m.get("bug-id"),
-                "fqdn": m["fqdn"],
-                "iteration_evosuite": m["iteration_evosuite"],
-                "iteration_refactored": m["iteration_refactored"],
-                "CodeBLEU": m["CodeBLEU"],
-                "METEOR": m["METEOR"],
-                "ROUGE-L": m["ROUGE-L"],
-                "AVG": m["average_score_1"],          # Uniform average
-                "CTSES1": m["CTSES_score_1"],         # Semantic-prioritized (0.5 / 0.3 / 0.2)
-                "CTSES2": m["CTSES_score_2"],         # Readability-aware (0.4 / 0.3 / 0.3)
-                "delta": m["CTSES_score_1"] - m["CodeBLEU"],  # Difference based on CTSES1
-                "original_test": p["original_test"],
-                "refactored_test": p["refactored_test"]
-            })
+        metrics = pd.DataFrame(json.load(f))
+    pairs = load_pairs(pairs_file)
+
+    # Keys of the corpus index only (compared as strings), with each pair's position for the later fetch
+    string_keys = [f"{column}_key" for column in JOIN_KEYS]
+    pair_keys = pd.DataFrame(list(pairs.positions), columns=string_keys)
+    pair_keys["position"] = list(pairs.positions.values())
+    metrics[string_keys] = metrics[JOIN_KEYS].astype(str).to_numpy()
+
+    merged = metrics.merge(pair_keys, on=string_keys, how="inner")
+    merged = pd.DataFrame({
+        "model": model,
+        "dataset": dataset,
+        "project_name": merged["project_name"],
+        "class": merged["class"],
+        "bug_id": merged["bug-id"] if "bug-id" in merged else None,
+        "fqdn": merged["fqdn"],
+        "iteration_evosuite": merged["iteration_evosuite"],
+        "iteration_refactored": merged["iteration_refactored"],
+        **{name: merged[column] for column, name in SCORE_COLUMNS.items()},
+        "delta": merged["CTSES_score_1"] - merged["CodeBLEU"],  # Difference based on CTSES1
+        # Size in bytes of the original test suite, from the corpus index (no source is read)
+        "test_size": [test_size(pairs, position) for position in merged["position"]],
+        "pairs_file": pairs_file,
+        "position": merged["position"]
+    })
+    pairs.close()
     return merged
 
 
+def test_size(pairs, position):
+    span = pairs.spans[position][pairs.text_columns["original_test"]]
+    return None if span is None else span[1]
+
+
+def attach_sources(selected):
+    """Fetch original_test / refactored_test of the selected rows only, by key into each pairs corpus."""
+    originals, refactored = [], []
+    # One corpus (index parse + mmap) per pairs file, closed once its rows are read
+    corpora = {pairs_file: load_pairs(pairs_file) for pairs_file in selected["pairs_file"].unique()}
+    try:
+        for pairs_file, position in zip(selected["pairs_file"], selected["position"]):
+            entry = corpora[pairs_file][position]
+            originals.append(entry["original_test"])
+            refactored.append(entry["refactored_test"])
+    finally:
+        for corpus in corpora.values():
+            corpus.close()
+    selected = selected.drop(columns=["test_size", "pairs_file", "position"])
+    selected["original_test"] = originals
+    selected["refactored_test"] = refactored
+    return selected
+
+
 # ============================
 # Selection strategy
 # ============================
@@ -95,34 +136,65 @@ def select_group(df, group, n=N_PER_GROUP):
 
 
 # ============================
-# Main pipeline
+# Output
 # ============================
-# Load all data
-all_data = []
-for model in MODELS:
-    for dataset in DATASETS:
-        all_data.extend(load_and_merge(model, dataset))
-
-df = pd.DataFrame(all_data)
-print(f"Total merged samples: {len(df)}")
-
-# Representative selection
-selected = pd.concat([
-    select_group(df, "G1"),
-    select_group(df, "G2"),
-    select_group(df, "G3")
-])
+def save(selected, stem):
+    out_csv = f"{stem}.csv"
+    out_jsonl = f"{stem}.jsonl"
 
-print(f"Selected {len(selected)} cases total.")
+    selected.to_csv(out_csv, index=False)
 
-# Save as CSV and JSONL
-out_csv = "selected_refactorings_15.csv"
-out_jsonl = "selected_refactorings_15.jsonl"
+    with open(out_jsonl, "w") as f:
+        for _, row in selected.iterrows():
+            f.write(json.dumps(row.to_dict()) + "\n")
 
-selected.to_csv(out_csv, index=False)
+    print(f"Saved {out_csv} and {out_jsonl}")
 
-with open(out_jsonl, "w") as f:
-    for _, row in selected.iterrows():
-        f.write(json.dumps(row.to_dict()) + "\n")
 
-print(f"Saved {out_csv} and {out_jsonl}")
+# ============================
+# Main pipeline
+# ============================
+def main():
+    parser = argparse.ArgumentParser(description="Select test pairs for human annotation.")
+    parser.add_argument("--size", type=int, default=None,
+                        help="Draw a stratified batch of this size instead of the 3 x 5 delta groups of the paper")
+    parser.add_argument("--allocation", choices=ALLOCATIONS, default="proportional")
+    parser.add_argument("--minimum", type=int, default=0, help="Cases drawn from every stratum before allocation")
+    parser.add_argument("--delta-bins", type=int, default=BINNED["delta"])
+    parser.add_argument("--size-bins", type=int, default=BINNED["test_size"])
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    # Load all data
+    df = pd.concat([load_and_merge(model, dataset) for model in MODELS for dataset in DATASETS], ignore_index=True)
+    print(f"Total merged samples: {len(df)}")
+
+    if args.size is None:
+        # Representative selection
+        selected = pd.concat([
+            select_group(df, "G1"),
+            select_group(df, "G2"),
+            select_group(df, "G3")
+        ])
+        print(f"Selected {len(selected)} cases total.")
+        save(attach_sources(selected), "selected_refactorings_15")
+        return
+
+    # Strata over model, dataset, project, test-suite size and delta quantiles
+    selected, strata, coverage = stratified_sample(
+        df, args.size, args.allocation, args.minimum, args.seed,
+        binned={"test_size": args.size_bins, "delta": args.delta_bins})
+    covered = (strata["Allocated"] > 0).sum()
+    print(f"Selected {len(selected)} cases from {covered} of {len(strata)} strata ({args.allocation} allocation).")
+    print(coverage.groupby("Dimension", sort=False)["Covered"].agg(["sum", "size"])
+          .rename(columns={"sum": "levels covered", "size": "levels"}))
+
+    stem = f"selected_refactorings_{len(selected)}"
+    save(attach_sources(selected), stem)
+    coverage.to_csv(f"{stem}_coverage.csv", index=False, float_format="%.2f")
+    strata.to_csv(f"{stem}_strata.csv", index=False)
+    print(f"Saved {stem}_coverage.csv and {stem}_strata.csv")
+
+
+if __name__ == "__main__":
+    main()
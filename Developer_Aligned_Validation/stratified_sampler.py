@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# === Configuration ===
+# Dimensions whose levels are taken as they are
+CATEGORICAL = ["model", "dataset", "project_name"]
+# Dimensions cut into this many quantile bins over the whole population
+BINNED = {"test_size": 4, "delta": 5}
+ALLOCATIONS = ["proportional", "equal"]
+SEED = 42
+MISSING = "missing"
+
+# === Strata ===
+def quantile_codes(values, bins):
+    """Quantile bin (0..bins-1) of every value and the bin labels; NaN falls in an extra MISSING bin."""
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    edges = np.unique(np.quantile(values[present], np.linspace(0, 1, bins + 1)[1:-1])) if present.any() else np.empty(0)
+    codes = np.where(present, np.searchsorted(edges, values, side="right"), len(edges) + 1)
+    bounds = np.concatenate([[-np.inf], edges, [np.inf]])
+    labels = [f"q{i + 1} [{bounds[i]:.4g}, {bounds[i + 1]:.4g})" for i in range(len(edges) + 1)] + [MISSING]
+    return codes, labels
+
+def assign_strata(df, categorical=CATEGORICAL, binned=BINNED):
+    """Stratum of every row (0..S-1) and one row per non-empty stratum with its levels and population.
+
+    Each dimension is encoded once as integer codes, the codes are combined with
+    ravel_multi_index and the combinations present are renumbered, so the cost is
+    a few array passes whatever the number of strata.
+    """
+    codes, levels = {}, {}
+    for column in categorical:
+        codes[column], uniques = pd.factorize(df[column].fillna(MISSING).astype(str), sort=True)
+        levels[column] = list(uniques)
+    for column, bins in binned.items():
+        codes[column], levels[column] = quantile_codes(pd.to_numeric(df[column], errors="coerce"), bins)
+    combined = np.ravel_multi_index([codes[c] for c in codes], [len(levels[c]) for c in codes])
+    occupied, strata, population = np.unique(combined, return_inverse=True, return_counts=True)
+    table = pd.DataFrame({
+        column: np.asarray(levels[column], dtype=object)[index]
+        for column, index in zip(codes, np.unravel_index(occupied, [len(levels[c]) for c in codes]))
+    })
+    table.insert(0, "stratum", np.arange(len(occupied)))
+    table["Population"] = population
+    return strata.ravel(), table, codes, levels
+
+# === Allocation ===
+def largest_remainder(capacity, n, rng):
+    """n draws split in proportion to capacity (Hamilton rounding, ties broken at random); never above capacity."""
+    if n == 0 or capacity.sum() == 0:
+        return np.zeros_like(capacity)
+    quota = n * capacity / capacity.sum()
+    allocation = np.floor(quota).astype(np.int64)
+    remainder = quota - allocation
+    allocation[np.lexsort((rng.random(len(capacity)), -remainder))[:n - allocation.sum()]] += 1
+    return allocation
+
+def water_fill(capacity, n, rng):
+    """n draws spread as evenly as possible over the strata, full strata giving their share to the others."""
+    if n == 0:
+        return np.zeros_like(capacity)
+    # Highest level L with sum(min(capacity, L)) <= n
+    low, high = 0, int(capacity.max())
+    while low < high:
+        level = (low + high + 1) // 2
+        if np.minimum(capacity, level).sum() <= n:
+            low = level
+        else:
+            high = level - 1
+    allocation = np.minimum(capacity, low)
+    # The draws left over go one each to the largest strata that still have room
+    open_strata = np.flatnonzero(capacity > low)
+    largest = open_strata[np.lexsort((rng.random(len(open_strata)), -capacity[open_strata]))]
+    allocation[largest[:n - allocation.sum()]] += 1
+    return allocation
+
+def allocate(population, n, method="proportional", minimum=0, seed=SEED):
+    """Draws per stratum: `minimum` each (or the whole stratum if smaller), the rest by `method`."""
+    population = np.asarray(population, dtype=np.int64)
+    n = min(int(n), int(population.sum()))
+    base = np.minimum(population, minimum)
+    if base.sum() > n:
+        raise ValueError(f"{n} draws cannot give {minimum} to each of the {len(population)} strata "
+                         f"({base.sum()} needed); lower --minimum or use fewer dimensions")
+    capacity = population - base
+    rng = np.random.default_rng(seed)
+    if method == "proportional":
+        return base + largest_remainder(capacity, n - base.sum(), rng)
+    if method == "equal":
+        return base + water_fill(capacity, n - base.sum(), rng)
+    raise ValueError(f"Unknown allocation {method!r}, expected one of {ALLOCATIONS}")
+
+# === Drawing ===
+def draw(strata, allocation, seed=SEED):
+    """Row indices of a sample taking allocation[s] rows of every stratum s uniformly at random.
+
+    One random key per row and one lexsort by (stratum, key) give each row its rank
+    inside its stratum; the rows ranked below their stratum's allocation are drawn.
+    The same seed, rows and allocation always give the same sample.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(strata)), strata))
+    counts = np.bincount(strata, minlength=len(allocation))
+    starts = np.cumsum(counts) - counts
+    ranks = np.arange(len(strata)) - starts[strata[order]]
+    return order[ranks < allocation[strata[order]]]
+
+def stratified_sample(df, n, method="proportional", minimum=0, seed=SEED, categorical=CATEGORICAL, binned=BINNED):
+    """Sampled rows of df (with their stratum), the strata table and the coverage report."""
+    strata, table, codes, levels = assign_strata(df, categorical, binned)
+    table["Allocated"] = allocate(table["Population"], n, method, minimum, seed)
+    selected = draw(strata, table["Allocated"].to_numpy(), seed)
+    sample = df.iloc[selected].assign(stratum=strata[selected])
+    return sample, table, coverage_report(codes, levels, selected)
+
+# === Coverage ===
+def coverage_report(codes, levels, selected):
+    """Population and sample count and share of every level of every dimension."""
+    rows = []
+    for column, code in codes.items():
+        population = np.bincount(code, minlength=len(levels[column]))
+        sampled = np.bincount(code[selected], minlength=len(levels[column]))
+        for level, p, s in zip(levels[column], population, sampled):
+            if p:
+                rows.append({"Dimension": column, "Level": level, "Population": int(p),
+                             "Population %": 100 * p / len(code), "Sampled": int(s),
+                             "Sampled %": 100 * s / max(1, len(selected)), "Covered": bool(s)})
+    return pd.DataFrame(rows)
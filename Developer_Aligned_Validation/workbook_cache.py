@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# === Configuration ===
+CACHE_DIR = ".workbook_cache"
+MANIFEST = "manifest.json"
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# === Fingerprint ===
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_dir(path):
+    """Cache folder of a workbook: .workbook_cache/<file name> next to it."""
+    path = Path(path).resolve()
+    return path.parent / CACHE_DIR / path.name
+
+def read_manifest(path):
+    manifest = cache_dir(path) / MANIFEST
+    if not manifest.exists():
+        return None
+    with open(manifest, "r") as f:
+        return json.load(f)
+
+def is_current(path, manifest):
+    """True when the cached sheets were parsed from this exact workbook.
+
+    Same path, size and mtime is enough; when only the mtime changed (copy, checkout)
+    the content hash decides and the manifest is refreshed if it still matches.
+    """
+    if manifest is None or manifest["path"] != str(Path(path).resolve()):
+        return False
+    stat = os.stat(path)
+    if manifest["size"] != stat.st_size:
+        return False
+    if manifest["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if manifest["sha1"] != file_hash(path):
+        return False
+    manifest["mtime_ns"] = stat.st_mtime_ns
+    write_json(cache_dir(path) / MANIFEST, manifest)
+    return True
+
+# === Sheet files ===
+def write_json(target, data):
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, target)
+
+def write_sheet(df, target):
+    """Parquet when pyarrow can type every column, a pickle of the frame otherwise (e.g. mixed int/str cells)."""
+    if HAS_PARQUET:
+        try:
+            df.to_parquet(target.with_suffix(".parquet"), index=False)
+            return target.with_suffix(".parquet").name
+        except (TypeError, ValueError, ImportError) as e:  # ArrowInvalid / ArrowTypeError derive from ValueError / TypeError
+            print(f"[CACHE] {target.name}: parquet unavailable ({type(e).__name__}), using pickle")
+    with open(target.with_suffix(".pkl"), "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return target.with_suffix(".pkl").name
+
+def read_sheet(source):
+    if source.suffix == ".parquet":
+        return pd.read_parquet(source)
+    with open(source, "rb") as f:
+        return pickle.load(f)
+
+def build_cache(path):
+    """Parse every sheet of the workbook once and store each as a typed binary file."""
+    folder = cache_dir(path)
+    folder.mkdir(parents=True, exist_ok=True)
+    for stale in folder.glob("sheet*"):
+        stale.unlink()
+    stat = os.stat(path)
+    sheets = pd.read_excel(path, sheet_name=None)
+    files = {name: write_sheet(df, folder / f"sheet{i}") for i, (name, df) in enumerate(sheets.items())}
+    # The manifest is written last, so an interrupted build is never taken as current
+    manifest = {"path": str(Path(path).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "sha1": file_hash(path), "sheets": files}
+    write_json(folder / MANIFEST, manifest)
+    return manifest, sheets
+
+# === Loading ===
+def read_excel(path, sheet_name=0):
+    """pd.read_excel(path, sheet_name) served from the cache; sheet_name None returns every sheet."""
+    manifest = read_manifest(path)
+    if is_current(path, manifest):
+        folder = cache_dir(path)
+        names = list(manifest["sheets"])
+        wanted = names if sheet_name is None else [names[sheet_name] if isinstance(sheet_name, int) else sheet_name]
+        sheets = {name: read_sheet(folder / manifest["sheets"][name]) for name in wanted}
+    else:
+        manifest, sheets = build_cache(path)
+        names = list(sheets)
+    if sheet_name is None:
+        return sheets
+    return sheets[names[sheet_name] if isinstance(sheet_name, int) else sheet_name]
+
+# === Entry point ===
+def main():
+    parser = argparse.ArgumentParser(description="Parse workbooks once into typed binary sheet files.")
+    parser.add_argument("files", nargs="*", help="Workbooks to cache (default: every .xlsx here)")
+    args = parser.parse_args()
+
+    for path in args.files or sorted(Path(".").glob("*.xlsx")):
+        started = time.perf_counter()
+        cached = is_current(path, read_manifest(path))
+        sheets = read_excel(path, sheet_name=None)
+        print(f"[CACHE] {'hit ' if cached else 'built'} {path}: {len(sheets)} sheet(s) "
+              f"in {1000 * (time.perf_counter() - started):.1f} ms")
+
+if __name__ == "__main__":
+    main()
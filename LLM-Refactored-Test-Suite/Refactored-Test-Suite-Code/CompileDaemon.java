@@ -0,0 +1,194 @@
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+
+/**
+ * Long-lived compilation service: keeps a JVM warm and compiles test sources in memory
+ * with javax.tools against a fixed classpath. Used by compile_service.py.
+ *
+ * Protocol (big-endian, strings are int32 length + UTF-8 bytes), per batch:
+ *   request:  int32 jobs, then per job: string id, int32 files, then per file: string name, string source
+ *   response: per job: string id, bool success, int64 micros, int32 diagnostics,
+ *             then per diagnostic: string kind, string file, int64 line, int64 column, string message
+ * A connection carries any number of batches; the client closes it when done.
+ *
+ * Usage: java CompileDaemon <port> <classpath> [threads]
+ */
+public class CompileDaemon {
+
+    private static JavaCompiler compiler;
+    private static List<String> options;
+    private static ExecutorService compilePool;
+    // File managers cache the opened classpath archives; they are not thread-safe, so one per thread
+    private static final ThreadLocal<StandardJavaFileManager> FILE_MANAGERS =
+            ThreadLocal.withInitial(() -> compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8));
+
+    public static void main(String[] args) throws IOException {
+        int port = Integer.parseInt(args[0]);
+        String classpath = args.length > 1 ? args[1] : "";
+        int threads = args.length > 2 ? Integer.parseInt(args[2]) : Runtime.getRuntime().availableProcessors();
+
+        compiler = ToolProvider.getSystemJavaCompiler();
+        if (compiler == null) {
+            System.err.println("[DAEMON] No system Java compiler: run the daemon with a JDK, not a JRE");
+            System.exit(2);
+        }
+        options = Arrays.asList("-classpath", classpath, "-proc:none", "-nowarn", "-g:none", "-encoding", "UTF-8");
+        compilePool = Executors.newFixedThreadPool(threads);
+        ExecutorService connections = Executors.newCachedThreadPool();
+
+        try (ServerSocket server = new ServerSocket(port, 64, InetAddress.getLoopbackAddress())) {
+            System.out.println("[DAEMON] Listening on 127.0.0.1:" + server.getLocalPort() + " with " + threads + " compiler threads");
+            System.out.flush();
+            while (true) {
+                Socket socket = server.accept();
+                connections.submit(() -> serve(socket));
+            }
+        }
+    }
+
+    // === Connection handling ===
+    private static void serve(Socket socket) {
+        try (Socket s = socket;
+             DataInputStream in = new DataInputStream(new BufferedInputStream(s.getInputStream()));
+             DataOutputStream out = new DataOutputStream(new BufferedOutputStream(s.getOutputStream()))) {
+            while (true) {
+                int jobs;
+                try {
+                    jobs = in.readInt();
+                } catch (EOFException e) {
+                    return;
+                }
+                List<Future<Result>> results = new ArrayList<>();
+                for (int i = 0; i < jobs; i++) {
+                    String id = readString(in);
+                    int files = in.readInt();
+                    List<JavaFileObject> sources = new ArrayList<>();
+                    for (int f = 0; f < files; f++) {
+                        sources.add(new SourceFile(readString(in), readString(in)));
+                    }
+                    results.add(compilePool.submit(() -> compile(id, sources)));
+                }
+                for (Future<Result> future : results) {
+                    future.get().write(out);
+                }
+                out.flush();
+            }
+        } catch (Exception e) {
+            System.err.println("[DAEMON] Connection error: " + e);
+        }
+    }
+
+    // === Compilation ===
+    private static Result compile(String id, List<JavaFileObject> sources) {
+        long start = System.nanoTime();
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        boolean success;
+        try {
+            JavaCompiler.CompilationTask task = compiler.getTask(
+                    null, new MemoryFileManager(FILE_MANAGERS.get()), diagnostics, options, null, sources);
+            success = task.call();
+        } catch (RuntimeException e) {
+            success = false;
+        }
+        return new Result(id, success, (System.nanoTime() - start) / 1000, diagnostics.getDiagnostics());
+    }
+
+    /** Java source held in memory; the name is the file name, e.g. Foo_ESTest.java. */
+    private static final class SourceFile extends SimpleJavaFileObject {
+        private final String source;
+
+        SourceFile(String name, String source) {
+            super(URI.create("string:///" + name), Kind.SOURCE);
+            this.source = source;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return source;
+        }
+    }
+
+    /** Discards the generated class files instead of writing them to disk. */
+    private static final class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className, JavaFileObject.Kind kind, FileObject sibling) {
+            return new SimpleJavaFileObject(URI.create("mem:///" + className.replace('.', '/') + kind.extension), kind) {
+                @Override
+                public OutputStream openOutputStream() {
+                    return new ByteArrayOutputStream();
+                }
+            };
+        }
+    }
+
+    private static final class Result {
+        private final String id;
+        private final boolean success;
+        private final long micros;
+        private final List<Diagnostic<? extends JavaFileObject>> diagnostics;
+
+        Result(String id, boolean success, long micros, List<Diagnostic<? extends JavaFileObject>> diagnostics) {
+            this.id = id;
+            this.success = success;
+            this.micros = micros;
+            this.diagnostics = diagnostics;
+        }
+
+        void write(DataOutputStream out) throws IOException {
+            writeString(out, id);
+            out.writeBoolean(success);
+            out.writeLong(micros);
+            out.writeInt(diagnostics.size());
+            for (Diagnostic<? extends JavaFileObject> diagnostic : diagnostics) {
+                writeString(out, diagnostic.getKind().name());
+                writeString(out, diagnostic.getSource() == null ? "" : diagnostic.getSource().getName());
+                out.writeLong(diagnostic.getLineNumber());
+                out.writeLong(diagnostic.getColumnNumber());
+                writeString(out, diagnostic.getMessage(null));
+            }
+        }
+    }
+
+    // === Wire format ===
+    private static String readString(DataInputStream in) throws IOException {
+        byte[] bytes = new byte[in.readInt()];
+        in.readFully(bytes);
+        return new String(bytes, StandardCharsets.UTF_8);
+    }
+
+    private static void writeString(DataOutputStream out, String value) throws IOException {
+        byte[] bytes = value.getBytes(StandardCharsets.UTF_8);
+        out.writeInt(bytes.length);
+        out.write(bytes);
+    }
+}
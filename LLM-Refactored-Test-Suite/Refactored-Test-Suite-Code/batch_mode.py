@@ -0,0 +1,230 @@
+import json
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from sharding import load_entries
+from response_cache import cache_key, make_record
+from prompt_budget import merge_outputs
+from output_store import output_exists
+
+# === Configuration ===
+BATCH_DIR = Path("batch_jobs")
+ENDPOINT = "/v1/chat/completions"
+BATCH_SIZE = 20000
+POLL_INTERVAL = 60
+NUM_ITERATIONS = 3
+
+RUNNERS = {
+    "gpt": {"script": "gpt-scenario1-part1.py", "model_dir": "GPT", "provider": "openai",
+            "max_tokens": "RESERVED_TOKENS"},
+    "mistral": {"script": "mistral-scenario1-part1.py", "model_dir": "MISTRAL", "provider": "mistral",
+                "max_tokens": "RESERVED_RESPONSE_TOKENS"},
+}
+DATASETS = [
+    {"name": "Defects4J", "has_bug_id": True},
+    {"name": "SF110", "has_bug_id": False}
+]
+
+def load_runner(name):
+    """Import a runner script for its prompt construction, output layout, client and cache."""
+    path = Path(__file__).resolve().parent / RUNNERS[name]["script"]
+    spec = importlib.util.spec_from_file_location(f"{name}_runner", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# === Batch input ===
+def build_requests(runner, config, dataset, iterations):
+    """Return (batch lines, manifest) for the outputs that are still missing.
+
+    The manifest maps each output to the custom_ids of its prompt parts (several
+    for suites split by the prompt budgeter). Parts already answered in the
+    response cache are not resubmitted.
+    """
+    lines, manifest = [], {}
+    max_tokens = getattr(runner, config["max_tokens"])
+    for index, entry in enumerate(load_entries(config["model_dir"], dataset["name"])):
+        for iteration in iterations:
+            out_path, filename = runner.output_location(entry, dataset["name"], dataset["has_bug_id"], iteration)
+            if output_exists(out_path / filename):
+                continue
+            prompts = runner.prepare_prompts(entry)
+            if prompts is None:
+                continue
+
+            output_id = f"{dataset['name']}-{index}-iter-{iteration}"
+            parts = []
+            for part, prompt in enumerate(prompts):
+                key = cache_key(config["provider"], runner.MODEL_NAME, runner.TEMPERATURE, max_tokens, prompt, iteration)
+                custom_id = f"{output_id}-part-{part}"
+                parts.append({"custom_id": custom_id, "key": key})
+                if runner.cache.get(key):
+                    continue
+                body = {
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": max_tokens,
+                    "temperature": runner.TEMPERATURE
+                }
+                if config["provider"] == "openai":
+                    lines.append({"custom_id": custom_id, "method": "POST", "url": ENDPOINT,
+                                  "body": {"model": runner.MODEL_NAME, **body}})
+                else:
+                    lines.append({"custom_id": custom_id, "body": body})
+            manifest[output_id] = {"parts": parts, "sample": iteration, "out_path": str(out_path), "filename": filename}
+    return lines, manifest
+
+def save_ready_outputs(runner, manifest):
+    """Write every output whose prompt parts are all answered in the response cache."""
+    saved = 0
+    for item in manifest.values():
+        records = [runner.cache.get(part["key"]) for part in item["parts"]]
+        if all(records):
+            runner.save_output(Path(item["out_path"]), item["filename"],
+                               merge_outputs([record["completion"].strip() for record in records]))
+            saved += 1
+    return saved
+
+def write_jsonl(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+# === Provider endpoints ===
+def submit_openai(runner, input_path):
+    with open(input_path, "rb") as f:
+        uploaded = runner.client.files.create(file=f, purpose="batch")
+    batch = runner.client.batches.create(input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h")
+    return batch.id
+
+def poll_openai(runner, job_id):
+    """Return (finished, output_file_id, status)."""
+    batch = runner.client.batches.retrieve(job_id)
+    finished = batch.status in ("completed", "failed", "expired", "cancelled")
+    return finished, batch.output_file_id, batch.status
+
+def download_openai(runner, file_id):
+    return runner.client.files.content(file_id).text
+
+def submit_mistral(runner, input_path):
+    uploaded = runner.client.files.upload(
+        file={"file_name": input_path.name, "content": input_path.read_bytes()},
+        purpose="batch"
+    )
+    job = runner.client.batch.jobs.create(input_files=[uploaded.id], model=runner.MODEL_NAME, endpoint=ENDPOINT)
+    return job.id
+
+def poll_mistral(runner, job_id):
+    job = runner.client.batch.jobs.get(job_id=job_id)
+    finished = job.status in ("SUCCESS", "FAILED", "TIMEOUT_EXCEEDED", "CANCELLED")
+    return finished, job.output_file, job.status
+
+def download_mistral(runner, file_id):
+    response = runner.client.files.download(file_id=file_id)
+    return response.read().decode("utf-8")
+
+PROVIDERS = {
+    "openai": (submit_openai, poll_openai, download_openai),
+    "mistral": (submit_mistral, poll_mistral, download_mistral),
+}
+
+# === Fan-out ===
+def collect(runner, config, job_dir, output_text):
+    """Store every successful batch result in the response cache, then write the completed outputs."""
+    with open(job_dir / "manifest.json", "r") as f:
+        manifest = json.load(f)
+    prompts = {}
+    with open(job_dir / "input.jsonl", "r") as f:
+        for line in f:
+            request = json.loads(line)
+            prompts[request["custom_id"]] = request["body"]["messages"][0]["content"]
+    max_tokens = getattr(runner, config["max_tokens"])
+
+    parts = {part["custom_id"]: (part["key"], item["sample"]) for item in manifest.values() for part in item["parts"]}
+
+    failed = 0
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result["custom_id"] not in parts or result.get("error") or response.get("status_code") != 200:
+            runner.log_error("batch_error", f"{result['custom_id']}: {result.get('error') or response.get('status_code')}")
+            failed += 1
+            continue
+        key, sample = parts[result["custom_id"]]
+        body = response["body"]
+        runner.cache.put(key, make_record(
+            config["provider"], runner.MODEL_NAME, runner.TEMPERATURE, max_tokens,
+            prompts[result["custom_id"]], sample, body["choices"][0]["message"]["content"], body.get("usage"),
+            body["choices"][0].get("finish_reason")
+        ))
+    return save_ready_outputs(runner, manifest), failed
+
+# === Batch cycle ===
+def run_dataset(name, runner, dataset, iterations, poll_interval):
+    config = RUNNERS[name]
+    submit, poll, download = PROVIDERS[config["provider"]]
+    dataset_dir = BATCH_DIR / config["model_dir"] / dataset["name"]
+
+    # Resume chunks submitted by an interrupted run before building new ones
+    job_dirs = sorted(path.parent for path in dataset_dir.glob("chunk_*/job.json"))
+    pending = [path for path in job_dirs if not (path / "collected").exists()]
+    if not pending:
+        lines, manifest = build_requests(runner, config, dataset, iterations)
+        replayed = save_ready_outputs(runner, manifest)
+        if not lines:
+            print(f"[BATCH] {config['model_dir']}/{dataset['name']}: nothing to submit ({replayed} outputs replayed from cache)")
+            return
+        offset = len(job_dirs)
+        for start in range(0, len(lines), BATCH_SIZE):
+            chunk = lines[start:start + BATCH_SIZE]
+            job_dir = dataset_dir / f"chunk_{offset + start // BATCH_SIZE:03d}"
+            write_jsonl(job_dir / "input.jsonl", chunk)
+            # Outputs split across chunks are written by whichever chunk completes them last
+            chunk_ids = {line["custom_id"] for line in chunk}
+            with open(job_dir / "manifest.json", "w") as f:
+                json.dump({output_id: item for output_id, item in manifest.items()
+                           if any(part["custom_id"] in chunk_ids for part in item["parts"])}, f, indent=4)
+            job_id = submit(runner, job_dir / "input.jsonl")
+            with open(job_dir / "job.json", "w") as f:
+                json.dump({"job_id": job_id, "requests": len(chunk), "submitted_at": int(time.time())}, f, indent=4)
+            print(f"[BATCH] Submitted {job_id} ({len(chunk)} requests) from {job_dir}")
+            pending.append(job_dir)
+
+    while pending:
+        for job_dir in list(pending):
+            with open(job_dir / "job.json", "r") as f:
+                job_id = json.load(f)["job_id"]
+            finished, output_file, status = poll(runner, job_id)
+            if not finished:
+                continue
+            pending.remove(job_dir)
+            if not output_file:
+                runner.log_error("batch_error", f"{job_id} ended with status {status} and no output")
+                (job_dir / "collected").write_text(status)
+                continue
+            output_text = download(runner, output_file)
+            (job_dir / "output.jsonl").write_text(output_text)
+            saved, failed = collect(runner, config, job_dir, output_text)
+            (job_dir / "collected").write_text(status)
+            print(f"[BATCH] {job_id} {status}: {saved} outputs saved, {failed} failed")
+        if pending:
+            time.sleep(poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the refactoring scenario through the provider batch APIs.")
+    parser.add_argument("model", choices=sorted(RUNNERS))
+    parser.add_argument("--datasets", nargs="+", default=[ds["name"] for ds in DATASETS])
+    parser.add_argument("--iterations", type=int, default=NUM_ITERATIONS)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    runner = load_runner(args.model)
+    for dataset in DATASETS:
+        if dataset["name"] in args.datasets:
+            run_dataset(args.model, runner, dataset, range(1, args.iterations + 1), args.poll_interval)
+
+if __name__ == "__main__":
+    main()
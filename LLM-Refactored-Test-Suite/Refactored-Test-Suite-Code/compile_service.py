@@ -0,0 +1,222 @@
+import os
+import re
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import Future
+from prompt_budget import extract_code, split_suite
+from output_store import read_output
+
+# === Configuration ===
+DAEMON_SOURCE = Path(__file__).resolve().parent / "CompileDaemon.java"
+BUILD_DIR = Path("compile_daemon_build")
+DEFAULT_PORT = 7070
+BATCH_SIZE = 32
+BATCH_WAIT = 0.05
+NUM_ITERATIONS = 3
+CLASS_PATTERN = re.compile(r"\bpublic\s+(?:final\s+|abstract\s+)*class\s+(\w+)")
+
+# === Wire format (see CompileDaemon.java) ===
+def pack_string(value):
+    data = value.encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+def pack_batch(jobs):
+    parts = [struct.pack(">i", len(jobs))]
+    for job in jobs:
+        parts.append(pack_string(job["id"]))
+        parts.append(struct.pack(">i", len(job["files"])))
+        for name, source in job["files"]:
+            parts.append(pack_string(name) + pack_string(source))
+    return b"".join(parts)
+
+class Reader:
+    def __init__(self, sock):
+        self.file = sock.makefile("rb")
+
+    def read(self, size):
+        data = self.file.read(size)
+        if len(data) < size:
+            raise ConnectionError("compile daemon closed the connection")
+        return data
+
+    def int32(self):
+        return struct.unpack(">i", self.read(4))[0]
+
+    def int64(self):
+        return struct.unpack(">q", self.read(8))[0]
+
+    def boolean(self):
+        return self.read(1) != b"\x00"
+
+    def string(self):
+        return self.read(self.int32()).decode("utf-8")
+
+    def result(self):
+        result = {"id": self.string(), "success": self.boolean(), "micros": self.int64(), "diagnostics": []}
+        for _ in range(self.int32()):
+            result["diagnostics"].append({
+                "kind": self.string(), "file": self.string(), "line": self.int64(),
+                "column": self.int64(), "message": self.string()
+            })
+        return result
+
+# === Client ===
+class CompileClient:
+    """One connection to the daemon; compile_batch sends jobs and returns their results in order."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.sock = socket.create_connection((host, port))
+        self.reader = Reader(self.sock)
+
+    def compile_batch(self, jobs):
+        self.sock.sendall(pack_batch(jobs))
+        return [self.reader.result() for _ in jobs]
+
+    def close(self):
+        self.sock.close()
+
+class CompileBatcher:
+    """Collect jobs submitted by many worker threads into batches over one connection.
+
+    `submit` returns a Future; a sender thread ships up to BATCH_SIZE pending jobs,
+    or whatever arrived within BATCH_WAIT seconds, per round trip.
+    """
+
+    def __init__(self, client, batch_size=BATCH_SIZE, wait=BATCH_WAIT):
+        self.client = client
+        self.batch_size = batch_size
+        self.wait = wait
+        self.pending = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.sender = threading.Thread(target=self.run, daemon=True)
+        self.sender.start()
+
+    def submit(self, job_id, files):
+        future = Future()
+        with self.condition:
+            self.pending.append(({"id": job_id, "files": files}, future))
+            self.condition.notify()
+        return future
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                deadline = time.monotonic() + self.wait
+                while len(self.pending) < self.batch_size and not self.closed and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+                batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            try:
+                results = self.client.compile_batch([job for job, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.sender.join()
+
+# === Daemon process ===
+def start_daemon(classpath, port=DEFAULT_PORT, threads=None):
+    """Build CompileDaemon.java once and start it; return the process once it listens."""
+    BUILD_DIR.mkdir(exist_ok=True)
+    class_file = BUILD_DIR / "CompileDaemon.class"
+    if not class_file.exists() or class_file.stat().st_mtime < DAEMON_SOURCE.stat().st_mtime:
+        subprocess.run(["javac", "-d", str(BUILD_DIR), str(DAEMON_SOURCE)], check=True)
+    command = ["java", "-cp", str(BUILD_DIR), "CompileDaemon", str(port), classpath, str(threads or os.cpu_count())]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "Listening" not in line:
+        process.kill()
+        raise RuntimeError(f"compile daemon did not start: {line.strip()}")
+    print(line.strip())
+    return process
+
+def source_files(code, extra_sources=()):
+    """[(file name, source)] for a refactored suite, named after its public class."""
+    match = CLASS_PATTERN.search(code)
+    name = f"{match.group(1) if match else 'RefactoredTest'}.java"
+    return [(name, code)] + list(extra_sources)
+
+def scaffolding_for(code, scaffolding_dir):
+    """EvoSuite `<Class>_ESTest_scaffolding.java` source the suite extends, if present in the directory."""
+    if not scaffolding_dir:
+        return []
+    match = re.search(r"\bextends\s+(\w+_scaffolding)\b", code)
+    path = Path(scaffolding_dir) / f"{match.group(1)}.java" if match else None
+    return [(path.name, path.read_text())] if path and path.exists() else []
+
+# === Entry point ===
+def main():
+    from sharding import load_entries
+    from batch_mode import load_runner, RUNNERS, DATASETS
+    from scoring_pipeline import SCORE_DIR, make_pair, pair_key
+
+    parser = argparse.ArgumentParser(description="Compile the refactored suites of a model through the warm compile daemon.")
+    parser.add_argument("model", choices=sorted(RUNNERS))
+    parser.add_argument("--classpath", required=True, help="Project classes, JUnit, EvoSuite runtime and scaffolding classes")
+    parser.add_argument("--scaffolding-dir", default=None, help="Directory of *_ESTest_scaffolding.java sources")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--no-daemon", action="store_true", help="Connect to an already running daemon")
+    args = parser.parse_args()
+
+    daemon = None if args.no_daemon else start_daemon(args.classpath, args.port, args.threads)
+    client = CompileClient(port=args.port)
+    batcher = CompileBatcher(client)
+    runner = load_runner(args.model)
+    model_dir = RUNNERS[args.model]["model_dir"]
+    try:
+        for dataset in DATASETS:
+            futures, tests = {}, 0
+            start = time.perf_counter()
+            for entry in load_entries(model_dir, dataset["name"]):
+                for iteration in range(1, NUM_ITERATIONS + 1):
+                    out_path, filename = runner.output_location(entry, dataset["name"], dataset["has_bug_id"], iteration)
+                    completion = read_output(out_path / filename)
+                    if completion is None:
+                        continue
+                    code = extract_code(completion)
+                    key = pair_key(make_pair(entry, dataset["name"], iteration, code))
+                    tests += len(split_suite(code)[1])
+                    futures[key] = batcher.submit(key, source_files(code, scaffolding_for(code, args.scaffolding_dir)))
+            if not futures:
+                continue
+
+            compiled, errors = 0, Counter()
+            result_path = SCORE_DIR / model_dir / dataset["name"] / "compile.jsonl"
+            result_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(result_path, "w") as f:
+                for key, future in futures.items():
+                    result = future.result()
+                    compiled += result["success"]
+                    errors.update(d["message"].partition("\n")[0] for d in result["diagnostics"] if d["kind"] == "ERROR")
+                    f.write(json.dumps({"key": key, **result}) + "\n")
+            elapsed = time.perf_counter() - start
+            print(f"[COMPILE] {model_dir}/{dataset['name']}: {compiled}/{len(futures)} suites compile, "
+                  f"{len(futures) / elapsed:.1f} suites/s, {tests / elapsed:.1f} tests/s -> {result_path}")
+            for message, count in errors.most_common(5):
+                print(f"    {count:6d} x {message}")
+    finally:
+        batcher.close()
+        client.close()
+        if daemon:
+            daemon.terminate()
+
+if __name__ == "__main__":
+    main()
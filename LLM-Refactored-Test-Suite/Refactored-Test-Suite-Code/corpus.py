@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from collections.abc import Mapping
+
+# === Configuration ===
+# Long string fields kept in the blob; every other field stays in the index
+TEXT_FIELDS = ("test_code", "Static_part_to_keep_from_EvoSuite", "original_test", "refactored_test")
+# Keys of the runner datasets (DATASET/<MODEL>/<dataset>_partN.json) and of the *-test-pairs.json files
+ENTRY_KEY = ("project_name", "class", "bug-id", "iteration")
+PAIR_KEY = ("project_name", "class", "iteration_evosuite", "iteration_refactored")
+MAGIC = b"CTSESC01"
+HEADER = struct.Struct(">8sQ")
+
+# === Build ===
+def source_stamp(path):
+    stat = Path(path).stat()
+    return {"path": Path(path).name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def build_corpus(path, sources, key_fields=ENTRY_KEY, derived=None):
+    """Pack the JSON entry lists of `sources` into one corpus file.
+
+    Layout: MAGIC, the byte length of the index, the JSON index, then the blob of
+    UTF-8 test sources back to back. The index keeps the small fields of every
+    entry, the source part it came from and the (offset, length) of each text field
+    within the blob; identical texts (e.g. a static part shared by iterations) are
+    stored once. `derived` maps a column name to a function of the entry, computed
+    once here and read back with `CorpusEntry.derived`.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    blob_path = tmp_path.with_suffix(".blob")
+    index = {"key_fields": list(key_fields), "text_fields": [], "sources": [],
+             "rows": [], "parts": [], "spans": [], "derived": {name: [] for name in derived or {}}}
+    offsets, size = {}, 0
+    with open(blob_path, "wb") as blob:
+        for part, source in enumerate(sources):
+            index["sources"].append(source_stamp(source))
+            with open(source, "r") as f:
+                entries = json.load(f)
+            for entry in entries:
+                spans = {}
+                for field in TEXT_FIELDS:
+                    if not isinstance(entry.get(field), str):
+                        continue
+                    if field not in index["text_fields"]:
+                        index["text_fields"].append(field)
+                    data = entry[field].encode("utf-8")
+                    digest = hashlib.sha256(data).digest()
+                    if digest not in offsets:
+                        blob.write(data)
+                        offsets[digest] = size
+                        size += len(data)
+                    spans[field] = [offsets[digest], len(data)]
+                index["rows"].append({k: v for k, v in entry.items() if k not in spans})
+                index["parts"].append(part)
+                index["spans"].append(spans)
+                for name, function in (derived or {}).items():
+                    index["derived"][name].append(function(entry))
+    # Spans as one list per row, in text_fields order (None when the entry lacks the field)
+    index["spans"] = [[spans.get(field) for field in index["text_fields"]] for spans in index["spans"]]
+
+    header = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    with open(tmp_path, "wb") as out, open(blob_path, "rb") as blob:
+        out.write(HEADER.pack(MAGIC, len(header)))
+        out.write(header)
+        while chunk := blob.read(1 << 20):
+            out.write(chunk)
+    os.remove(blob_path)
+    # Runners starting together may all build; the last rename wins with identical content
+    os.replace(tmp_path, path)
+    return path
+
+def is_current(path, sources):
+    """True if the corpus exists and was built from these sources, unchanged since."""
+    path = Path(path)
+    if not path.exists():
+        return False
+    with open(path, "rb") as f:
+        magic, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            return False
+        recorded = json.loads(f.read(length))["sources"]
+    return recorded == [source_stamp(source) for source in sources]
+
+# === Access ===
+class CorpusEntry(Mapping):
+    """Read-only view of one entry; text fields are decoded from the mapped blob on access."""
+
+    __slots__ = ("corpus", "position")
+
+    def __init__(self, corpus, position):
+        self.corpus = corpus
+        self.position = position
+
+    def __getitem__(self, field):
+        column = self.corpus.text_columns.get(field)
+        if column is not None and self.corpus.spans[self.position][column] is not None:
+            return self.corpus.text(self.position, column)
+        return self.corpus.rows[self.position][field]
+
+    def __iter__(self):
+        yield from self.corpus.rows[self.position]
+        for field, column in self.corpus.text_columns.items():
+            if self.corpus.spans[self.position][column] is not None:
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @property
+    def key(self):
+        return self.corpus.key(self.position)
+
+    @property
+    def derived(self):
+        return {name: values[self.position] for name, values in self.corpus.derived.items()}
+
+    def __repr__(self):
+        return f"CorpusEntry({self.key})"
+
+class Corpus:
+    """Memory-mapped corpus file: the index is loaded, test sources are read only when an entry asks."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a corpus file")
+        index = json.loads(self.data[HEADER.size:HEADER.size + length])
+        self.base = HEADER.size + length
+        self.key_fields = index["key_fields"]
+        self.text_columns = {field: column for column, field in enumerate(index["text_fields"])}
+        self.sources = index["sources"]
+        self.rows = index["rows"]
+        self.parts = index["parts"]
+        self.spans = index["spans"]
+        self.derived = index["derived"]
+        self.positions = {self.key(position): position for position in range(len(self.rows))}
+
+    def key(self, position):
+        row = self.rows[position]
+        return tuple(str(row.get(field, "")) for field in self.key_fields)
+
+    def text(self, position, column):
+        offset, length = self.spans[position][column]
+        start = self.base + offset
+        return self.data[start:start + length].decode("utf-8")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, position):
+        return CorpusEntry(self, position)
+
+    def __iter__(self):
+        for position in range(len(self.rows)):
+            yield CorpusEntry(self, position)
+
+    def get(self, key):
+        """Entry whose key fields (compared as strings) equal `key`, or None."""
+        position = self.positions.get(tuple(str(value) for value in key))
+        return None if position is None else CorpusEntry(self, position)
+
+    def part(self, number):
+        """Entries that came from the `number`-th source file."""
+        return [CorpusEntry(self, position) for position, part in enumerate(self.parts) if part == number]
+
+    def stats(self):
+        return {
+            "entries": len(self.rows),
+            "sources": len(self.sources),
+            "index_bytes": self.base - HEADER.size,
+            "blob_bytes": len(self.data) - self.base
+        }
+
+    def close(self):
+        self.data.close()
+
+def open_corpus(path, sources, key_fields=ENTRY_KEY, derived=None):
+    """Open the corpus at `path`, building it first if it is missing or a source changed."""
+    if not is_current(path, sources):
+        build_corpus(path, sources, key_fields, derived)
+    return Corpus(path)
+
+# === Entry point ===
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an indexed corpus of test entries.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Pack JSON entry lists into a corpus file")
+    build.add_argument("corpus")
+    build.add_argument("sources", nargs="+")
+    build.add_argument("--pairs", action="store_true", help="Key on the *-test-pairs.json identifiers")
+    get = subparsers.add_parser("get", help="Print one entry as JSON")
+    get.add_argument("corpus")
+    get.add_argument("key", nargs="+")
+    stats = subparsers.add_parser("stats")
+    stats.add_argument("corpus")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_corpus(args.corpus, args.sources, PAIR_KEY if args.pairs else ENTRY_KEY)
+    corpus = Corpus(args.corpus)
+    if args.command == "get":
+        entry = corpus.get(args.key)
+        if entry is None:
+            sys.exit(f"[CORPUS] No entry {tuple(args.key)} in {corpus.path}")
+        print(json.dumps(dict(entry), indent=4))
+        return
+    stats = corpus.stats()
+    print(f"[CORPUS] {corpus.path}: {stats['entries']} entries from {stats['sources']} files, "
+          f"{stats['index_bytes'] / 1e3:.1f} kB index, {stats['blob_bytes'] / 1e6:.1f} MB of sources")
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,38 @@
 import os
-import json
 import time
 import re
+import threading
 from pathlib import Path
-from openai import OpenAI, APIError, APIConnectionError, RateLimitError, AuthenticationError, PermissionError
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
 from dotenv import load_dotenv
-import tiktoken
+from sharding import load_entries, claim_entries, WorkerStats
+from rate_control import RateController, classify_error, FATAL, MAX_CONCURRENCY
+from response_cache import ResponseCache, cache_key, make_record, OFFLINE
+from prompt_budget import plan_prompts, merge_outputs, count_tokens
+from prompt_compaction import compact_test_code
+from streaming import complete_openai, record_latency
+from length_model import LengthPredictor
+from scoring_pipeline import ScoringPipeline, SCORE_INLINE
+from output_store import write_output, output_exists
 
 # === Configuration ===
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY-1"))
-encoding = tiktoken.encoding_for_model("gpt-4o")
+controller = RateController()
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY-1"), http_client=controller.http_client(timeout=600), max_retries=0)
+cache = ResponseCache()
 
 MODEL_NAME = "gpt-4o"
 MAX_TOKENS = 128000
 RESERVED_TOKENS = 16000
+PROMPT_BUDGET = MAX_TOKENS - RESERVED_TOKENS
+# max_tokens per request, predicted from past output lengths (RESERVED_TOKENS until fitted)
+predictor = LengthPredictor.load(MODEL_NAME, RESERVED_TOKENS)
 TEMPERATURE = 0.1
 NUM_ITERATIONS = 3
 
 OUTPUT_DIR = Path("Refactoring-output/Scenario-1")
 LOG_DIR = Path("logs")
-DATASET_DIR = Path(__file__).resolve().parent / "DATASET"
 FLAG_DIR = Path("iteration_flags")
 
 # === Utility functions ===
@@ -37,15 +49,8 @@ def clean_text(text):
     text = re.sub(r'[ \t]+', ' ', text)
     return '\n'.join(line.strip() for line in text.strip().splitlines())
 
-def trim_tokens(text):
-    max_prompt_tokens = MAX_TOKENS - RESERVED_TOKENS
-    tokens = encoding.encode(text)
-    return encoding.decode(tokens[:max_prompt_tokens]) if len(tokens) > max_prompt_tokens else text
-
 def save_output(dir_path, filename, content):
-    dir_path.mkdir(parents=True, exist_ok=True)
-    with open(dir_path / filename, "w") as f:
-        f.write(content)
+    write_output(dir_path / filename, content)
 
 # === Prompt generation ===
 def build_prompt(static_part, test_code):
@@ -72,68 +77,109 @@ Return only the final refactored code enclosed in triple backticks ``` ``` for e
 """.strip()
 
 # === OpenAI API call ===
-def call_openai(prompt, retries=30):
-    prompt = trim_tokens(prompt)
+def call_openai(prompt, sample, retries=30):
+    # Keyed on the RESERVED_TOKENS ceiling, not the predicted budget: the same prompt and sample
+    # hit the same entry whatever budget the length predictor picks on a later run
+    key = cache_key("openai", MODEL_NAME, TEMPERATURE, RESERVED_TOKENS, prompt, sample)
+    cached = cache.get(key)
+    if cached:
+        return cached["completion"].strip()
+    if OFFLINE:
+        log_error("cache_miss", key)
+        return None
+
+    prompt_tokens = count_tokens(prompt, MODEL_NAME)
+    budget = predictor.max_tokens(prompt_tokens)
     for attempt in range(retries):
         try:
-            response = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=RESERVED_TOKENS,
-                temperature=TEMPERATURE
-            )
-            return response.choices[0].message.content.strip()
-
-        except (APIError, APIConnectionError, RateLimitError, AuthenticationError, PermissionError) as e:
-            log_error("openai_error", f"{type(e).__name__}: {e}")
-            time.sleep(5 if not isinstance(e, RateLimitError) else 10)
+            with controller.slot(prompt_tokens + budget):
+                # Streamed; the connection is closed as soon as the code fence is complete
+                result = complete_openai(client, MODEL_NAME, prompt, budget, TEMPERATURE)
+            controller.on_success()
+            record_latency("openai", MODEL_NAME, result)
+            if result["finish_reason"] == "length" and budget < RESERVED_TOKENS:
+                # Predicted budget too small: retry at once with a larger one
+                budget = predictor.grow(budget)
+                continue
+            completion = result["completion"]
+            cache.put(key, make_record("openai", MODEL_NAME, TEMPERATURE, budget, prompt, sample, completion,
+                                       result["usage"], result["finish_reason"]))
+            return completion.strip()
 
         except Exception as e:
-            log_error("unexpected_error", str(e))
-            time.sleep(5)
+            if classify_error(e) == FATAL:
+                log_error("openai_error", f"[fatal] {type(e).__name__}: {e}")
+                return None
+            log_error("openai_error", f"{type(e).__name__}: {e}")
+            time.sleep(controller.backoff(attempt, e))
     return None
 
 # === Dataset processing ===
-def process_dataset(dataset_path, dataset_name, has_bug_id):
-    with open(dataset_path, 'r') as f:
-        data = json.load(f)
-
+def output_location(entry, dataset_name, has_bug_id, iteration):
+    project = entry["project_name"]
+    clazz = entry["class"]
+    iteration_id = entry.get("iteration", "")
+    bug_id = entry.get("bug-id", "")
+
+    if has_bug_id:
+        out_path = OUTPUT_DIR / "GPT" / dataset_name / project / clazz / str(bug_id) / f"testsuite_{iteration_id}"
+        filename = f"{iteration_id}-{project}-{bug_id}-{clazz}-refactoring-output-iter-{iteration}.txt"
+    else:
+        out_path = OUTPUT_DIR / "GPT" / dataset_name / project / clazz / f"testsuite_{iteration_id}"
+        filename = f"{iteration_id}-{project}-{clazz}-refactoring-output-iter-{iteration}.txt"
+    return out_path, filename
+
+def prepare_prompts(entry):
+    test_code = clean_text(compact_test_code(entry["test_code"], entry["Static_part_to_keep_from_EvoSuite"]))
+    static_part = clean_text(entry["Static_part_to_keep_from_EvoSuite"])
+
+    if not test_code or not static_part:
+        log_error(f"{entry['project_name']}_{entry['class']}_{entry.get('iteration', '')}", "Empty cleaned input")
+        return None
+    return plan_prompts(static_part, test_code, build_prompt, MODEL_NAME, PROMPT_BUDGET)
+
+def refactor_entry(entry, dataset_name, has_bug_id, iteration, scorer):
+    out_path, filename = output_location(entry, dataset_name, has_bug_id, iteration)
+    if output_exists(out_path / filename):
+        return
+
+    prompts = prepare_prompts(entry)
+    if prompts is None:
+        return
+    # Oversized suites are split at @Test boundaries; the partial refactorings are merged back
+    responses = [call_openai(prompt, iteration) for prompt in prompts]
+    response = merge_outputs(responses) if all(responses) else None
+
+    if response:
+        save_output(out_path, filename, response)
+        if scorer:
+            scorer.submit(entry, dataset_name, iteration, response)
+    else:
+        log_error(filename, "No output generated or request failed")
+
+def process_dataset(data, dataset_name, has_bug_id, stats, scorer):
     for iteration in range(1, NUM_ITERATIONS + 1):
-        for entry in data:
-            project = entry["project_name"]
-            clazz = entry["class"]
-            iteration_id = entry.get("iteration", "")
-            bug_id = entry.get("bug-id", "")
-            test_code = clean_text(entry["test_code"])
-            static_part = clean_text(entry["Static_part_to_keep_from_EvoSuite"])
-
-            if not test_code or not static_part:
-                log_error(f"{project}_{clazz}_{iteration_id}", "Empty cleaned input")
-                continue
+        # Only claim a new entry once a worker thread is free; the controller paces the calls
+        pending = threading.Semaphore(MAX_CONCURRENCY)
 
-            if has_bug_id:
-                out_path = OUTPUT_DIR / "GPT" / dataset_name / project / clazz / str(bug_id) / f"testsuite_{iteration_id}"
-                filename = f"{iteration_id}-{project}-{bug_id}-{clazz}-refactoring-output-iter-{iteration}.txt"
-            else:
-                out_path = OUTPUT_DIR / "GPT" / dataset_name / project / clazz / f"testsuite_{iteration_id}"
-                filename = f"{iteration_id}-{project}-{clazz}-refactoring-output-iter-{iteration}.txt"
+        def done(future):
+            pending.release()
+            if future.exception():
+                log_error("unexpected_error", f"{type(future.exception()).__name__}: {future.exception()}")
 
-            if (out_path / filename).exists():
-                continue
-
-            prompt = build_prompt(static_part, test_code)
-            response = call_openai(prompt)
-
-            if response:
-                save_output(out_path, filename, response)
-            else:
-                log_error(filename, "No output generated or request failed")
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+            for entry, cost in claim_entries(data, f"{dataset_name}-iter-{iteration}", "GPT"):
+                pending.acquire()
+                stats.record(cost)
+                pool.submit(refactor_entry, entry, dataset_name, has_bug_id, iteration, scorer).add_done_callback(done)
 
         FLAG_DIR.mkdir(exist_ok=True)
         flag_file = FLAG_DIR / f"iteration_{iteration}_{Path(__file__).stem}.flag"
         with open(flag_file, "w") as f:
             f.write("completed")
 
+    stats.save()
+
 # === Entry point ===
 def main():
     datasets = [
@@ -142,12 +188,19 @@ def main():
     ]
     models = ["GPT"]
 
+    stats = WorkerStats("GPT", Path(__file__).stem)
+    # Metric workers score each output as soon as it is saved
+    scorer = ScoringPipeline("GPT", Path(__file__).stem) if SCORE_INLINE else None
+
     for model in models:
         for ds in datasets:
-            path = DATASET_DIR / model / f"{ds['name']}_part3.json"
-            if not path.exists():
+            data = load_entries(model, ds["name"])
+            if not data:
                 continue
-            process_dataset(path, ds["name"], ds["has_bug_id"])
+            process_dataset(data, ds["name"], ds["has_bug_id"], stats, scorer)
+
+    if scorer:
+        scorer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from collections import defaultdict
+from response_cache import ResponseCache
+
+# === Configuration ===
+MODEL_PATH = Path("length_model.json")
+QUANTILE = 0.98
+SAFETY_MARGIN = 1.15
+MIN_TOKENS = 1024
+MIN_SAMPLES = 50
+
+# === Fitting ===
+def training_pairs(cache):
+    """(prompt_tokens, completion_tokens) per model, from responses that were not cut by max_tokens."""
+    pairs = defaultdict(list)
+    for record in cache.records():
+        usage = record.get("usage") or {}
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if not prompt_tokens or not completion_tokens or record.get("finish_reason") == "length":
+            continue
+        pairs[record["model"]].append((prompt_tokens, completion_tokens))
+    return pairs
+
+def quantile(values, q):
+    ordered = sorted(values)
+    position = q * (len(ordered) - 1)
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def fit(pairs, q=QUANTILE):
+    """Least squares of log(output) on log(input), plus the q-quantile of the residuals."""
+    xs = [math.log(prompt_tokens) for prompt_tokens, _ in pairs]
+    ys = [math.log(completion_tokens) for _, completion_tokens in pairs]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x if var_x else 0.0
+    intercept = mean_y - slope * mean_x
+    residuals = [y - (intercept + slope * x) for x, y in zip(xs, ys)]
+    return {
+        "intercept": intercept,
+        "slope": slope,
+        "residual_quantile": quantile(residuals, q),
+        "quantile": q,
+        "samples": len(pairs),
+        "fitted_at": int(time.time())
+    }
+
+# === Prediction ===
+class LengthPredictor:
+    """Per-request max_tokens from the fitted model, clipped to [MIN_TOKENS, ceiling]."""
+
+    def __init__(self, params, ceiling, margin=SAFETY_MARGIN):
+        self.params = params
+        self.ceiling = ceiling
+        self.margin = margin
+
+    @classmethod
+    def load(cls, model, ceiling, path=MODEL_PATH):
+        """Predictor for `model`; without a fitted model every request keeps the `ceiling`."""
+        params = None
+        if Path(path).exists():
+            with open(path, "r") as f:
+                params = json.load(f).get(model)
+        return cls(params, ceiling)
+
+    def max_tokens(self, prompt_tokens):
+        if not self.params:
+            return self.ceiling
+        p = self.params
+        predicted = math.exp(p["intercept"] + p["slope"] * math.log(max(prompt_tokens, 1)) + p["residual_quantile"])
+        return int(min(self.ceiling, max(MIN_TOKENS, math.ceil(predicted * self.margin))))
+
+    def grow(self, budget):
+        """Budget for the retry of a response truncated at `budget` tokens."""
+        return min(self.ceiling, budget * 2)
+
+# === Report ===
+def report(model, params, pairs, ceiling):
+    """Tokens reserved per request before and after, and the truncations the predictor would have caused."""
+    predictor = LengthPredictor(params, ceiling)
+    budgets = [predictor.max_tokens(prompt_tokens) for prompt_tokens, _ in pairs]
+    before = sum(prompt_tokens + ceiling for prompt_tokens, _ in pairs) / len(pairs)
+    after = sum(prompt_tokens + budget for (prompt_tokens, _), budget in zip(pairs, budgets)) / len(pairs)
+    truncated = sum(completion_tokens > budget for (_, completion_tokens), budget in zip(pairs, budgets))
+    print(f"[{model}] {len(pairs)} responses | slope {params['slope']:.3f} | "
+          f"median max_tokens {int(quantile(budgets, 0.5))} (was {ceiling}) | "
+          f"reservation {before:.0f} -> {after:.0f} tokens/request: x{before / after:.2f} requests in flight per TPM | "
+          f"{truncated} ({100 * truncated / len(pairs):.1f}%) would retry")
+
+def main():
+    """Fit the predictor on the response cache and save it for the runners."""
+    ceiling = int(sys.argv[1]) if len(sys.argv) > 1 else 16000
+    models = {}
+    for model, pairs in sorted(training_pairs(ResponseCache()).items()):
+        if len(pairs) < MIN_SAMPLES:
+            print(f"[{model}] only {len(pairs)} responses, keeping max_tokens={ceiling}")
+            continue
+        models[model] = fit(pairs)
+        report(model, models[model], pairs, ceiling)
+    with open(MODEL_PATH, "w") as f:
+        json.dump(models, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ FLAG_DIR="iteration_flags_${MODEL}_${SCENARIO}"
 mkdir -p "$FLAG_DIR"
 rm -f "$FLAG_DIR"/*
 
+# Reset the shared work queue (claims) and per-worker makespan stats
+rm -rf "shard_claims/${MODEL^^}" shard_stats/"${MODEL^^}"_*.json
+
 # Total number of iterations
 NUM_ITERATIONS=3
 
@@ -45,6 +48,9 @@ check_iteration_completion() {
     done
 }
 
+# Refit the max_tokens predictor on the responses cached so far
+python3 length_model.py
+
 # Start all scripts
 run_scripts
 
@@ -59,3 +65,9 @@ wait
 # Final marker
 touch "all_iterations_completed_${MODEL}_${SCENARIO}.txt"
 echo "[DONE] All iterations completed for ${MODEL} ${SCENARIO}"
+
+# Per-worker makespan vs. the static part split
+python3 sharding.py "${MODEL^^}"
+
+# Score any output missed by the inline stage and export the metrics JSON
+python3 scoring_pipeline.py "${MODEL}"
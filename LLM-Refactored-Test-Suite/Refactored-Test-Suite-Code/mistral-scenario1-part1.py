@@ -1,25 +1,38 @@
 import os
-import json
 import time
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from mistralai import Mistral
 from dotenv import load_dotenv
+from sharding import load_entries, claim_entries, WorkerStats
+from rate_control import RateController, classify_error, FATAL, MAX_CONCURRENCY
+from response_cache import ResponseCache, cache_key, make_record, OFFLINE
+from prompt_budget import plan_prompts, merge_outputs, count_tokens
+from prompt_compaction import compact_test_code
+from streaming import complete_mistral, record_latency
+from length_model import LengthPredictor
+from scoring_pipeline import ScoringPipeline, SCORE_INLINE
+from output_store import write_output, output_exists
 
 # === Configuration ===
 load_dotenv()
-client = Mistral(api_key=os.getenv("MISTRAL_API_KEY-1"))
+controller = RateController()
+client = Mistral(api_key=os.getenv("MISTRAL_API_KEY-1"), client=controller.http_client(timeout=600), server_url=os.getenv("MISTRAL_SERVER_URL"))
+cache = ResponseCache()
 
 MODEL_NAME = "mistral-large-2407"
 TEMPERATURE = 0.1
 MAX_RETRIES = 30
-WAIT_TIME = 10
 NUM_ITERATIONS = 3
 MAX_PROMPT_TOKENS = 128000
 RESERVED_RESPONSE_TOKENS = 16000
+PROMPT_BUDGET = MAX_PROMPT_TOKENS - RESERVED_RESPONSE_TOKENS
+# max_tokens per request, predicted from past output lengths (RESERVED_RESPONSE_TOKENS until fitted)
+predictor = LengthPredictor.load(MODEL_NAME, RESERVED_RESPONSE_TOKENS)
 
 OUTPUT_DIR = Path("Refactoring-output/Scenario-1")
 LOG_DIR = Path("logs")
-DATASET_DIR = Path(__file__).resolve().parent / "DATASET"
 FLAG_DIR = Path("iteration_flags")
 
 # === Utility Functions ===
@@ -30,12 +43,7 @@ def log_error(filename, message):
         f.write(f"{message}\n")
 
 def save_output(dir_path, filename, content):
-    dir_path.mkdir(parents=True, exist_ok=True)
-    with open(dir_path / filename, "w") as f:
-        f.write(content)
-
-def trim_prompt(text, limit=MAX_PROMPT_TOKENS):
-    return text[:limit] if len(text) > limit else text
+    write_output(dir_path / filename, content)
 
 # === Prompt Construction ===
 def build_prompt(static_part, test_code):
@@ -60,61 +68,98 @@ Return only the final refactored code enclosed in triple backticks ``` ``` for e
 """.strip()
 
 # === Mistral API Call ===
-def call_mistral(prompt, retries=MAX_RETRIES):
+def call_mistral(prompt, sample, retries=MAX_RETRIES):
+    # Keyed on the RESERVED_RESPONSE_TOKENS ceiling, not the predicted budget: the same prompt and sample
+    # hit the same entry whatever budget the length predictor picks on a later run
+    key = cache_key("mistral", MODEL_NAME, TEMPERATURE, RESERVED_RESPONSE_TOKENS, prompt, sample)
+    cached = cache.get(key)
+    if cached:
+        return cached["completion"].strip()
+    if OFFLINE:
+        log_error("cache_miss", key)
+        return None
+
+    prompt_tokens = count_tokens(prompt, MODEL_NAME)
+    budget = predictor.max_tokens(prompt_tokens)
     for attempt in range(retries):
         try:
-            response = client.chat.complete(
-                model=MODEL_NAME,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=TEMPERATURE,
-                max_tokens=RESERVED_RESPONSE_TOKENS
-            )
-            return response.choices[0].message.content.strip()
+            with controller.slot(prompt_tokens + budget):
+                # Streamed; the connection is closed as soon as the code fence is complete
+                result = complete_mistral(client, MODEL_NAME, prompt, budget, TEMPERATURE)
+            controller.on_success()
+            record_latency("mistral", MODEL_NAME, result)
+            if result["finish_reason"] == "length" and budget < RESERVED_RESPONSE_TOKENS:
+                # Predicted budget too small: retry at once with a larger one
+                budget = predictor.grow(budget)
+                continue
+            completion = result["completion"]
+            cache.put(key, make_record("mistral", MODEL_NAME, TEMPERATURE, budget, prompt, sample, completion,
+                                       result["usage"], result["finish_reason"]))
+            return completion.strip()
         except Exception as e:
-            if attempt < retries - 1:
-                time.sleep(WAIT_TIME)
-            else:
+            if classify_error(e) == FATAL or attempt == retries - 1:
                 log_error("mistral_failure", f"{type(e).__name__}: {e}")
                 return None
+            time.sleep(controller.backoff(attempt, e))
 
 # === Dataset Processing ===
-def process_dataset(dataset_path, dataset_name, has_bug_id):
-    with open(dataset_path, 'r') as f:
-        data = json.load(f)
-
+def output_location(entry, dataset_name, has_bug_id, iteration):
+    project = entry["project_name"]
+    clazz = entry["class"]
+    iteration_id = entry.get("iteration", "")
+    bug_id = entry.get("bug-id", "")
+
+    if has_bug_id:
+        out_path = OUTPUT_DIR / "MISTRAL" / dataset_name / project / clazz / str(bug_id) / f"testsuite_{iteration_id}"
+        filename = f"{iteration_id}-{project}-{bug_id}-{clazz}-refactoring-output-iter-{iteration}.txt"
+    else:
+        out_path = OUTPUT_DIR / "MISTRAL" / dataset_name / project / clazz / f"testsuite_{iteration_id}"
+        filename = f"{iteration_id}-{project}-{clazz}-refactoring-output-iter-{iteration}.txt"
+    return out_path, filename
+
+def prepare_prompts(entry):
+    static_part = entry["Static_part_to_keep_from_EvoSuite"]
+    test_code = compact_test_code(entry["test_code"], static_part)
+    return plan_prompts(static_part, test_code, build_prompt, MODEL_NAME, PROMPT_BUDGET)
+
+def refactor_entry(entry, dataset_name, has_bug_id, iteration, scorer):
+    out_path, filename = output_location(entry, dataset_name, has_bug_id, iteration)
+    output_file = out_path / filename
+    if output_exists(output_file):
+        return
+
+    # Oversized suites are split at @Test boundaries; the partial refactorings are merged back
+    results = [call_mistral(prompt, iteration) for prompt in prepare_prompts(entry)]
+    result = merge_outputs(results) if all(results) else None
+    if result:
+        save_output(out_path, filename, result)
+        if scorer:
+            scorer.submit(entry, dataset_name, iteration, result)
+    else:
+        log_error(filename, "Empty response or failed request")
+
+def process_dataset(data, dataset_name, has_bug_id, stats, scorer):
     for iteration in range(1, NUM_ITERATIONS + 1):
-        for entry in data:
-            project = entry["project_name"]
-            clazz = entry["class"]
-            iteration_id = entry.get("iteration", "")
-            bug_id = entry.get("bug-id", "")
-            test_code = entry["test_code"]
-            static_part = entry["Static_part_to_keep_from_EvoSuite"]
-
-            if has_bug_id:
-                out_path = OUTPUT_DIR / "MISTRAL" / dataset_name / project / clazz / str(bug_id) / f"testsuite_{iteration_id}"
-                filename = f"{iteration_id}-{project}-{bug_id}-{clazz}-refactoring-output-iter-{iteration}.txt"
-            else:
-                out_path = OUTPUT_DIR / "MISTRAL" / dataset_name / project / clazz / f"testsuite_{iteration_id}"
-                filename = f"{iteration_id}-{project}-{clazz}-refactoring-output-iter-{iteration}.txt"
-
-            output_file = out_path / filename
-            if output_file.exists():
-                continue
+        # Only claim a new entry once a worker thread is free; the controller paces the calls
+        pending = threading.Semaphore(MAX_CONCURRENCY)
 
-            prompt = build_prompt(static_part, test_code)
-            prompt = trim_prompt(prompt)
+        def done(future):
+            pending.release()
+            if future.exception():
+                log_error("mistral_failure", f"{type(future.exception()).__name__}: {future.exception()}")
 
-            result = call_mistral(prompt)
-            if result:
-                save_output(out_path, filename, result)
-            else:
-                log_error(filename, "Empty response or failed request")
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as pool:
+            for entry, cost in claim_entries(data, f"{dataset_name}-iter-{iteration}", "MISTRAL"):
+                pending.acquire()
+                stats.record(cost)
+                pool.submit(refactor_entry, entry, dataset_name, has_bug_id, iteration, scorer).add_done_callback(done)
 
         FLAG_DIR.mkdir(exist_ok=True)
         with open(FLAG_DIR / f"iteration_{iteration}_{Path(__file__).stem}.flag", "w") as f:
             f.write("completed")
 
+    stats.save()
+
 # === Entry Point ===
 def main():
     datasets = [
@@ -123,12 +168,19 @@ def main():
     ]
     models = ["MISTRAL"]
 
+    stats = WorkerStats("MISTRAL", Path(__file__).stem)
+    # Metric workers score each output as soon as it is saved
+    scorer = ScoringPipeline("MISTRAL", Path(__file__).stem) if SCORE_INLINE else None
+
     for model in models:
         for ds in datasets:
-            path = DATASET_DIR / model / f"{ds['name']}_part1.json"
-            if not path.exists():
+            data = load_entries(model, ds["name"])
+            if not data:
                 continue
-            process_dataset(path, ds["name"], ds["has_bug_id"])
+            process_dataset(data, ds["name"], ds["has_bug_id"], stats, scorer)
+
+    if scorer:
+        scorer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,336 @@
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from collections import deque
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Configuration ===
+DEFAULT_PORT = 8000
+DEFAULT_RPM = 60
+DEFAULT_TPM = 200000
+WINDOW = 60.0
+STREAM_CHUNK = 16
+
+# === Rate-limit bookkeeping ===
+class SlidingWindow:
+    """Requests and tokens accepted over the last minute, shared by all handler threads."""
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.events = deque()
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.events and now - self.events[0][0] >= WINDOW:
+            self.events.popleft()
+
+    def admit(self, tokens):
+        """Return (admitted, headers) for a request costing `tokens`."""
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            used_requests = len(self.events)
+            used_tokens = sum(cost for _, cost in self.events)
+            admitted = used_requests < self.rpm and used_tokens + tokens <= self.tpm
+            if admitted:
+                self.events.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+            reset = WINDOW - (now - self.events[0][0]) if self.events else 0.0
+        headers = {
+            "x-ratelimit-limit-requests": str(self.rpm),
+            "x-ratelimit-remaining-requests": str(max(0, self.rpm - used_requests)),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            "x-ratelimit-limit-tokens": str(self.tpm),
+            "x-ratelimit-remaining-tokens": str(max(0, self.tpm - used_tokens)),
+            "x-ratelimit-reset-tokens": f"{reset:.3f}s",
+        }
+        if not admitted:
+            headers["retry-after"] = f"{max(reset, 0.1):.3f}"
+        return admitted, headers
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def fake_completion(model, prompt, max_tokens=None):
+    """Echo the test suite from the prompt inside a fenced block, like the real models are asked to."""
+    body = prompt.split("Test Suite:", 1)[-1].rsplit("Return only", 1)[0].strip()
+    content = (f"Here is the refactored test suite:\n```java\n{body}\n```\n"
+               "The refactoring preserves behavior: tests were renamed and Given-When-Then comments were added "
+               "without changing any assertion.")
+    finish_reason = "stop"
+    if max_tokens and estimate_tokens(content) > max_tokens:
+        content, finish_reason = content[:4 * max_tokens], "length"
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+# === Batch jobs ===
+class BatchStore:
+    """Uploaded files and batch jobs, processed in the background like the real batch APIs."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.files = {}
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, filename, purpose, content):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        record = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+            "sample_type": "batch_request" if purpose == "batch" else "batch_result",
+            "source": "upload",
+            "num_lines": content.count(b"\n")
+        }
+        with self.lock:
+            self.files[file_id] = (record, content)
+        return record
+
+    def create_job(self, job, input_file_ids, model):
+        with self.lock:
+            self.jobs[job["id"]] = job
+        threading.Thread(target=self.process, args=(job, input_file_ids, model), daemon=True).start()
+        return job
+
+    def process(self, job, input_file_ids, model):
+        time.sleep(self.delay)
+        lines = []
+        for file_id in input_file_ids:
+            lines.extend(line for line in self.files[file_id][1].decode("utf-8").splitlines() if line.strip())
+
+        outputs = []
+        for line in lines:
+            request = json.loads(line)
+            body = request.get("body", {})
+            prompt = "".join(message.get("content", "") for message in body.get("messages", []))
+            outputs.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": fake_completion(body.get("model", model), prompt, body.get("max_tokens"))},
+                "error": None
+            }))
+        output = self.add_file(f"{job['id']}_output.jsonl", "batch_result", ("\n".join(outputs) + "\n").encode("utf-8"))
+
+        with self.lock:
+            if "request_counts" in job:
+                job.update(status="completed", output_file_id=output["id"], completed_at=int(time.time()),
+                           request_counts={"total": len(lines), "completed": len(lines), "failed": 0})
+            else:
+                job.update(status="SUCCESS", output_file=output["id"], completed_at=int(time.time()),
+                           total_requests=len(lines), completed_requests=len(lines), succeeded_requests=len(lines))
+
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=default_policy).parsebytes(
+        b"Content-Type: " + content_type.encode("utf-8") + b"\r\n\r\n" + body
+    )
+    fields, filename, content = {}, None, b""
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if part.get_filename():
+            filename, content = part.get_filename(), part.get_payload(decode=True)
+        else:
+            fields[name] = part.get_content().strip()
+    return fields, filename, content
+
+# === HTTP handler ===
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("content-length", 0)))
+
+    def read_json(self):
+        return json.loads(self.read_body() or b"{}")
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            self.chat_completions()
+        elif path == "/v1/files":
+            self.upload_file()
+        elif path == "/v1/batches":
+            self.create_openai_batch()
+        elif path == "/v1/batch/jobs":
+            self.create_mistral_batch()
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        store = self.server.batches
+        match = re.fullmatch(r"/v1/files/([\w-]+)/content", path)
+        if match and match.group(1) in store.files:
+            content = store.files[match.group(1)][1]
+            self.send_response(200)
+            self.send_header("content-type", "application/octet-stream")
+            self.send_header("content-length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        match = re.fullmatch(r"/v1/(?:batches|batch/jobs)/([\w-]+)", path)
+        if match and match.group(1) in store.jobs:
+            with store.lock:
+                self.send_json(200, dict(store.jobs[match.group(1)]))
+            return
+        self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def upload_file(self):
+        fields, filename, content = parse_multipart(self.headers.get("content-type", ""), self.read_body())
+        self.send_json(200, self.server.batches.add_file(filename, fields.get("purpose", "batch"), content))
+
+    def create_openai_batch(self):
+        request = self.read_json()
+        job = {
+            "id": f"batch_{uuid.uuid4().hex[:12]}",
+            "object": "batch",
+            "endpoint": request["endpoint"],
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}
+        }
+        self.send_json(200, self.server.batches.create_job(job, [request["input_file_id"]], None))
+
+    def create_mistral_batch(self):
+        request = self.read_json()
+        job = {
+            "id": str(uuid.uuid4()),
+            "object": "batch",
+            "input_files": request["input_files"],
+            "endpoint": request["endpoint"],
+            "model": request["model"],
+            "metadata": request.get("metadata"),
+            "errors": [],
+            "status": "RUNNING",
+            "created_at": int(time.time()),
+            "total_requests": 0,
+            "completed_requests": 0,
+            "succeeded_requests": 0,
+            "failed_requests": 0,
+            "output_file": None,
+            "error_file": None
+        }
+        self.send_json(200, self.server.batches.create_job(job, request["input_files"], request["model"]))
+
+    def chat_completions(self):
+        if self.server.api_key and self.headers.get("authorization") != f"Bearer {self.server.api_key}":
+            self.send_json(401, {"error": {"message": "Invalid API key", "type": "invalid_request_error"}})
+            return
+        request = self.read_json()
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        reserved = estimate_tokens(prompt) + int(request.get("max_tokens") or 0)
+        admitted, headers = self.server.window.admit(reserved)
+        if not admitted:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, headers)
+            return
+        time.sleep(self.server.latency)
+        completion = fake_completion(request.get("model", ""), prompt, request.get("max_tokens"))
+        if request.get("stream"):
+            self.send_stream(completion, headers)
+        else:
+            self.send_json(200, completion, headers)
+
+    def send_stream(self, completion, headers):
+        """Send the completion as server-sent chat.completion.chunk events; stop if the client disconnects."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        content = completion["choices"][0]["message"]["content"]
+        pieces = [content[i:i + STREAM_CHUNK] for i in range(0, len(content), STREAM_CHUNK)]
+        base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+                "model": completion["model"]}
+        events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]}
+                  for piece in pieces]
+        events.append({**base, "choices": [{"index": 0, "delta": {"content": ""},
+                                            "finish_reason": completion["choices"][0]["finish_reason"]}],
+                       "usage": completion["usage"]})
+        try:
+            for event in events:
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.server.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                self.server.cancelled_streams += 1
+        self.close_connection = True
+
+# === Entry point ===
+def make_server(port=DEFAULT_PORT, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, latency=0.2, api_key=None, batch_delay=2.0,
+                token_delay=0.005):
+    """Build a local server speaking the OpenAI/Mistral chat-completions, files and batch protocols."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    server.window = SlidingWindow(rpm, tpm)
+    server.latency = latency
+    server.api_key = api_key
+    server.batches = BatchStore(batch_delay)
+    server.token_delay = token_delay
+    server.cancelled_streams = 0
+    server.lock = threading.Lock()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI/Mistral chat (blocking or streamed) and batch APIs with rate-limit headers and 429 throttling.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM)
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--batch-delay", type=float, default=2.0)
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.rpm, args.tpm, args.latency, args.api_key, args.batch_delay, args.token_delay)
+    print(f"[MOCK] Listening on http://127.0.0.1:{args.port}/v1 (rpm={args.rpm}, tpm={args.tpm})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
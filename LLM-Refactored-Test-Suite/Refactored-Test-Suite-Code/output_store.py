@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import zlib
+import fcntl
+import hashlib
+import threading
+from pathlib import Path
+
+# === Configuration ===
+OUTPUT_ROOT = Path("Refactoring-output/Scenario-1")
+# "pack" writes into the packed store, "files" keeps one .txt per output
+OUTPUT_MODE = os.getenv("LLM_OUTPUT_STORE", "pack")
+DATA_FILE = "outputs.pack"
+INDEX_FILE = "outputs.idx"
+
+# === Store ===
+class OutputStore:
+    """Append-only packed store of completions, deduplicated by content hash.
+
+    <root>/outputs.pack holds zlib-compressed blobs back to back; <root>/outputs.idx
+    is a JSON-lines index mapping each output key (its path relative to the root,
+    e.g. GPT/SF110/<project>/<class>/testsuite_1/<file>.txt) to the sha256, offset
+    and length of its blob. Identical completions share one blob. Writers from
+    several processes serialize on an exclusive lock of the index file.
+    """
+
+    def __init__(self, root=OUTPUT_ROOT):
+        self.root = Path(root)
+        self.data_path = self.root / DATA_FILE
+        self.index_path = self.root / INDEX_FILE
+        self.entries = {}
+        self.blobs = {}
+        self.index_pos = 0
+        self.lock = threading.Lock()
+
+    def sync(self):
+        """Read index lines appended since the last call, including those of other processes.
+
+        A trailing line without newline is a write in progress (or torn by a crash) and
+        is left for later; a complete line that does not parse is skipped.
+        """
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self.index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self.index_pos += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"[STORE] Skipping corrupt index line at byte {self.index_pos - len(line)}", file=sys.stderr)
+                    continue
+                self.entries[record["key"]] = record
+                self.blobs[record["sha256"]] = (record["offset"], record["length"])
+
+    def put(self, key, content):
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock, open(self.index_path, "ab") as index:
+            fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                self.sync()
+                # Under the lock nobody else is writing: bytes past index_pos are a line torn by a crash
+                index.truncate(self.index_pos)
+                if digest not in self.blobs:
+                    blob = zlib.compress(data)
+                    with open(self.data_path, "ab") as f:
+                        offset = f.seek(0, os.SEEK_END)
+                        f.write(blob)
+                    self.blobs[digest] = (offset, len(blob))
+                offset, length = self.blobs[digest]
+                record = {"key": key, "sha256": digest, "offset": offset, "length": length}
+                line = (json.dumps(record) + "\n").encode("utf-8")
+                index.write(line)
+                index.flush()
+                self.entries[key] = record
+                self.index_pos += len(line)
+            finally:
+                fcntl.flock(index, fcntl.LOCK_UN)
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.sync()
+            record = self.entries.get(key)
+        if record is None:
+            return None
+        with open(self.data_path, "rb") as f:
+            blob = os.pread(f.fileno(), record["length"], record["offset"])
+        return zlib.decompress(blob).decode("utf-8")
+
+    def __contains__(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.sync()
+            return key in self.entries
+
+    def keys(self):
+        with self.lock:
+            self.sync()
+            return sorted(self.entries)
+
+    def stats(self):
+        with self.lock:
+            self.sync()
+        return {
+            "outputs": len(self.entries),
+            "unique_blobs": len(self.blobs),
+            "pack_bytes": self.data_path.stat().st_size if self.data_path.exists() else 0
+        }
+
+_stores = {}
+
+def get_store(root=OUTPUT_ROOT):
+    root = Path(root)
+    if root not in _stores:
+        _stores[root] = OutputStore(root)
+    return _stores[root]
+
+# === Output paths ===
+def output_key(path, root=OUTPUT_ROOT):
+    return Path(path).relative_to(root).as_posix()
+
+def output_exists(path):
+    """True if the output was saved, in the packed store or as a file."""
+    path = Path(path)
+    return output_key(path) in get_store() or path.exists()
+
+def read_output(path):
+    path = Path(path)
+    content = get_store().get(output_key(path))
+    if content is None and path.exists():
+        content = path.read_text()
+    return content
+
+def write_output(path, content):
+    path = Path(path)
+    if OUTPUT_MODE == "pack":
+        get_store().put(output_key(path), content)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+# === Bridge to the directory layout ===
+def export_tree(store, root, prefix=""):
+    """Write every stored output (optionally under a key prefix such as GPT/SF110) as a file below `root`."""
+    written = 0
+    for key in store.keys():
+        if key.startswith(prefix):
+            path = Path(root) / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(store.get(key))
+            written += 1
+    return written
+
+def import_tree(store, root):
+    """Pack every *.txt output below `root`, keyed by its relative path."""
+    imported = 0
+    for path in sorted(Path(root).rglob("*.txt")):
+        key = path.relative_to(root).as_posix()
+        if key not in store:
+            store.put(key, path.read_text())
+            imported += 1
+    return imported
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    store = get_store()
+    if command == "import":
+        root = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT_ROOT
+        print(f"[STORE] {import_tree(store, root)} outputs imported from {root}")
+    elif command == "export":
+        root = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT_ROOT
+        prefix = sys.argv[3] if len(sys.argv) > 3 else ""
+        print(f"[STORE] {export_tree(store, root, prefix)} outputs exported to {root}")
+    stats = store.stats()
+    print(f"[STORE] {stats['outputs']} outputs, {stats['unique_blobs']} unique completions, "
+          f"{stats['pack_bytes'] / 1e6:.1f} MB in {store.data_path}")
+
+if __name__ == "__main__":
+    main()
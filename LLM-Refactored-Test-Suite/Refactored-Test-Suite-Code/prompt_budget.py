@@ -0,0 +1,225 @@
+import re
+from functools import lru_cache
+import tiktoken
+
+try:
+    from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+except ImportError:  # tiktoken estimate below
+    MistralTokenizer = None
+
+FENCE_PATTERN = re.compile(r"```[ \t]*(?:java)?[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+IMPORT_PATTERN = re.compile(r"^[ \t]*import\s+[\w.*\s]+;", re.MULTILINE)
+PACKAGE_PATTERN = re.compile(r"^[ \t]*package\s+[\w.\s]+;", re.MULTILINE)
+ANNOTATION_PATTERN = re.compile(r"@[\w.]+(?:\s*\([^)]*\))?")
+
+# === Tokenizers ===
+@lru_cache(maxsize=None)
+def get_tokenizer(model):
+    """Return (encode, decode) for a model: tiktoken for GPT, the v3 SentencePiece tokenizer for Mistral Large 2407."""
+    if model.startswith("mistral") and MistralTokenizer is not None:
+        tokenizer = MistralTokenizer.v3().instruct_tokenizer.tokenizer
+        return (lambda text: tokenizer.encode(text, bos=False, eos=False)), tokenizer.decode
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        # mistral_common missing: o200k is a close (slightly optimistic) estimate for Mistral
+        encoding = tiktoken.get_encoding("o200k_base")
+    return encoding.encode, encoding.decode
+
+# Holds whole prompts (a full suite each): enough for the chunks of the suites in flight, not a dataset
+@lru_cache(maxsize=1024)
+def count_tokens(text, model):
+    encode, _ = get_tokenizer(model)
+    return len(encode(text))
+
+def truncate_tokens(text, model, limit):
+    encode, decode = get_tokenizer(model)
+    tokens = encode(text)
+    return decode(tokens[:limit]) if len(tokens) > limit else text
+
+# === Suite parsing ===
+def scan_code(code):
+    """Yield (index, char, depth) for every character outside comments and string/char literals."""
+    depth = 0
+    i = 0
+    n = len(code)
+    while i < n:
+        c = code[i]
+        if code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if c in "\"'":
+            j = i + 1
+            while j < n and code[j] != c:
+                j += 2 if code[j] == "\\" else 1
+            i = j + 1
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        yield i, c, depth
+        i += 1
+
+@lru_cache(maxsize=4096)
+def split_suite(test_code):
+    """Split a test class into (header, methods, footer) at @Test-method boundaries.
+
+    The header holds everything up to the first @Test (package, imports, fields,
+    set-up methods) plus any code found between two @Test methods (helpers, more
+    fields, a later @Before), since every method may depend on it. Each method runs
+    from its @Test annotation to its closing brace, led by the comments before it.
+    """
+    starts, ends = [], []
+    method_start = None
+    for i, c, depth in scan_code(test_code):
+        if c == "@" and depth == 1 and method_start is None and re.match(r"@Test\b", test_code[i:]):
+            method_start = i
+        elif c == "}" and depth == 1 and method_start is not None:
+            starts.append(method_start)
+            ends.append(i + 1)
+            method_start = None
+    if not starts:
+        return test_code, (), ""
+    prefix = test_code[:starts[0]]
+    shared, methods = [], []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        gap = test_code[ends[i - 1]:start] if i else ""
+        # Code of the gap ends at its last character outside comments; the comments after it lead the method
+        code_end = max((j + 1 for j, c, _ in scan_code(gap) if not c.isspace()), default=0)
+        if code_end:
+            shared.append(gap[:code_end])
+        methods.append(gap[code_end:].lstrip() + test_code[start:end])
+    # Shared declarations go after the first header, which keeps its indentation before the first method
+    header = prefix.rstrip() + "".join(shared) + prefix[len(prefix.rstrip()):] if shared else prefix
+    return header, tuple(methods), test_code[ends[-1]:]
+
+# === Packing ===
+def plan_prompts(static_part, test_code, build_prompt, model, budget):
+    """Return the prompts needed to send a whole suite within `budget` prompt tokens.
+
+    Suites that fit give a single prompt. Larger ones are packed into as many
+    whole @Test methods per prompt as fit, each prompt repeating the class header
+    (with the helpers and fields declared between tests) and footer. Only a header
+    and footer alone, or one method with them, larger than the budget is cut mid-code.
+    """
+    prompt = build_prompt(static_part, test_code)
+    if count_tokens(prompt, model) <= budget:
+        return [prompt]
+
+    header, methods, footer = split_suite(test_code)
+    overhead = count_tokens(build_prompt(static_part, header + footer), model)
+    prompts, chunk, used = [], [], overhead
+    for method in methods:
+        cost = count_tokens(method, model) + 2
+        if chunk and used + cost > budget:
+            prompts.append(build_prompt(static_part, header + "\n\n".join(chunk) + footer))
+            chunk, used = [], overhead
+        chunk.append(method)
+        used += cost
+    if chunk or not prompts:
+        prompts.append(build_prompt(static_part, header + "\n\n".join(chunk) + footer))
+    return [truncate_tokens(prompt, model, budget) for prompt in prompts]
+
+# === Merging ===
+def extract_code(response):
+    """Return the longest fenced code block of a completion, or the completion itself."""
+    blocks = FENCE_PATTERN.findall(response)
+    return max(blocks, key=len).strip() if blocks else response.strip()
+
+def class_members(code):
+    """Return (body start, closing brace, [(start, end)]) for the members of the first class in `code`.
+
+    A member runs from the end of the previous one (so it keeps its comments and
+    indentation) to its ';' or to the '}' closing its body; a field initialised
+    with braces (array, lambda, anonymous class) runs on to its ';'. None if the
+    class body is not closed.
+    """
+    body, members, start = None, [], None
+    parens, initializer = 0, False
+    for i, c, depth in scan_code(code):
+        if body is None:
+            if c == "{":
+                body = start = i + 1
+            continue
+        if depth == 0:
+            return body, i, members
+        if c == "(":
+            parens += 1
+        elif c == ")":
+            parens -= 1
+        elif depth == 1 and parens == 0:
+            if c == "=":
+                initializer = True
+            elif c == ";" or (c == "}" and not initializer):
+                members.append((start, i + 1))
+                start, initializer = i + 1, False
+    return None
+
+def member_key(member):
+    """Identity of a member: name and arity of a method, name of a field or nested type, text of an init block."""
+    code = ANNOTATION_PATTERN.sub(" ", "".join(c for _, c, _ in scan_code(member)))
+    head = re.split(r"[{;]", code, maxsplit=1)[0]
+    nested = re.search(r"\b(?:class|interface|enum|record)\s+(\w+)", head)
+    if nested:
+        return f"type {nested.group(1)}"
+    if "(" in head and "=" not in head.split("(", 1)[0]:
+        name = re.findall(r"\w+", head.split("(", 1)[0])
+        params = head[head.index("(") + 1:head.rfind(")")]
+        # Commas outside generic brackets separate the parameters
+        arity = 0 if not params.strip() else 1 + len(re.findall(r",(?![^<]*>)", params))
+        return f"method {name[-1] if name else ''}/{arity}"
+    name = re.findall(r"\w+", head.split("=", 1)[0])
+    if name and code.rstrip().endswith(";"):
+        return f"field {name[-1]}"
+    # Initialiser blocks have no name: the same text is the same block
+    return " ".join(code.split())
+
+def merge_outputs(responses):
+    """Merge the refactored classes of follow-up prompts into the first one.
+
+    Every follow-up brings its members (tests, and any helper, constant, field or
+    nested type the model added) and the imports the first class lacks. Members
+    already declared, like the shared header repeated in every prompt, are kept once.
+    """
+    if len(responses) == 1:
+        return responses[0]
+    base = extract_code(responses[0])
+    parsed = class_members(base)
+    if parsed is None:
+        return f"```java\n{base}\n```"
+    declared = {member_key(base[start:end]) for start, end in parsed[2]}
+    imports = {" ".join(statement.split()) for statement in IMPORT_PATTERN.findall(base[:parsed[0]])}
+    new_imports, extra = [], []
+    for response in responses[1:]:
+        code = extract_code(response)
+        members = class_members(code)
+        if members is None:
+            continue
+        for statement in IMPORT_PATTERN.findall(code[:members[0]]):
+            statement = " ".join(statement.split())
+            if statement not in imports:
+                imports.add(statement)
+                new_imports.append(statement)
+        for start, end in members[2]:
+            key = member_key(code[start:end])
+            if key not in declared:
+                declared.add(key)
+                # Blank lines before the member go, its indentation stays
+                extra.append(re.sub(r"^\s*\n", "", code[start:end]).rstrip())
+
+    merged = base
+    if extra:
+        closing = parsed[1]
+        merged = base[:closing].rstrip() + "\n\n" + "\n\n".join(extra) + "\n" + base[closing:]
+    if new_imports:
+        anchors = list(IMPORT_PATTERN.finditer(merged[:parsed[0]])) or list(PACKAGE_PATTERN.finditer(merged[:parsed[0]]))
+        at = anchors[-1].end() if anchors else 0
+        block = "\n".join(new_imports)
+        merged = merged[:at] + "\n" + block + merged[at:] if at else block + "\n\n" + merged
+    return f"```java\n{merged}\n```"
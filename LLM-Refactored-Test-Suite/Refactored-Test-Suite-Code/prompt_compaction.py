@@ -0,0 +1,188 @@
+import re
+import sys
+import json
+from pathlib import Path
+from collections import defaultdict
+from sharding import load_entries
+from prompt_budget import count_tokens
+
+try:
+    import tree_sitter_java
+    from tree_sitter import Language, Parser
+    JAVA_LANGUAGE = Language(tree_sitter_java.language())
+except ImportError:
+    JAVA_LANGUAGE = None
+
+# === Configuration ===
+REPORT_PATH = Path("compaction_report.json")
+MODELS = {"GPT": "gpt-4o", "MISTRAL": "mistral-large-2407"}
+DATASETS = ["Defects4J", "SF110"]
+INDENT = "  "
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<block_comment>/\*.*?\*/)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<string>"(?:\\.|[^"\\\n])*")
+  | (?P<char>'(?:\\.|[^'\\\n])+')
+  | (?P<newline>\n)
+  | (?P<space>[ \t\r\f]+)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<op>.)
+""", re.DOTALL | re.VERBOSE)
+
+LAYOUT = ("space", "newline", "block_comment", "line_comment")
+EVOSUITE_HEADER = "automatically generated by EvoSuite"
+NOISE_COMMENT = re.compile(r"//\s*(Undeclared exception!)?\s*$")
+
+# === Java tokenizer ===
+def tokenize(code):
+    return [(match.lastgroup, match.group()) for match in TOKEN_PATTERN.finditer(code)]
+
+def code_tokens(code):
+    """Tokens that carry meaning for the compiler (no layout, no comments)."""
+    return [text for kind, text in tokenize(code) if kind not in LAYOUT]
+
+def normalize(text):
+    return " ".join(code_tokens(text))
+
+# === Compaction ===
+def statement_end(tokens, start):
+    """Index after a top-level `package`/`import` statement or annotation starting at `start`."""
+    if tokens[start][1] == "@":
+        i = start + 1
+        while i < len(tokens) and tokens[i][0] in ("space", "newline"):
+            i += 1
+        i += 1
+        j = i
+        while j < len(tokens) and tokens[j][0] in ("space", "newline"):
+            j += 1
+        if j < len(tokens) and tokens[j][1] == "(":
+            depth = 0
+            for k in range(j, len(tokens)):
+                depth += {"(": 1, ")": -1}.get(tokens[k][1], 0)
+                if depth == 0:
+                    return k + 1
+        return i
+    for k in range(start, len(tokens)):
+        if tokens[k][1] == ";":
+            return k + 1
+    return len(tokens)
+
+def removable_spans(tokens, static_part):
+    """Spans of tokens the model never needs to see in the test code."""
+    static = f" {normalize(static_part)} " if static_part else ""
+    spans = []
+    depth = 0
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "block_comment" and EVOSUITE_HEADER in text:
+            spans.append((i, i + 1))
+        elif kind == "line_comment" and NOISE_COMMENT.match(text):
+            spans.append((i, i + 1))
+        elif depth == 0 and static and (text in ("package", "import") and kind == "word" or text == "@"):
+            end = statement_end(tokens, i)
+            if f' {normalize("".join(t for _, t in tokens[i:end]))} ' in static:
+                spans.append((i, end))
+                i = end
+                continue
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+        i += 1
+    return spans
+
+def render(tokens, removed):
+    """Re-emit the kept tokens with one blank-free line per source line and depth-based indentation."""
+    lines, line, depth = [], [], 0
+    pending_space = False
+    for index, (kind, text) in enumerate(tokens):
+        if index in removed:
+            continue
+        if kind == "newline":
+            if line:
+                lines.append(line)
+            line, pending_space = [], False
+            continue
+        if kind == "space":
+            pending_space = bool(line)
+            continue
+        if not line:
+            line_depth = depth - 1 if text == "}" else depth
+            line.append(INDENT * max(line_depth, 0))
+        elif pending_space:
+            line.append(" ")
+        line.append(text)
+        pending_space = False
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+    if line:
+        lines.append(line)
+    return "\n".join("".join(line) for line in lines)
+
+def compact_test_code(code, static_part=""):
+    """Drop EvoSuite boilerplate and layout noise without touching the code tokens.
+
+    Removed: the generated-by header, `// Undeclared exception!` markers, empty
+    `//` comment lines, and package/import/annotation statements repeated in the
+    static part sent with the prompt. If the remaining code tokens do not match
+    the original ones, the original code is returned unchanged.
+    """
+    tokens = tokenize(code)
+    spans = removable_spans(tokens, static_part)
+    removed = {i for start, end in spans for i in range(start, end)}
+    compacted = render(tokens, removed)
+
+    expected = [text for i, (kind, text) in enumerate(tokens) if i not in removed and kind not in LAYOUT]
+    return compacted if code_tokens(compacted) == expected else code
+
+def parses(code):
+    """True if tree-sitter-java finds no ERROR/MISSING node (None when tree-sitter is unavailable)."""
+    if JAVA_LANGUAGE is None:
+        return None
+    tree = Parser(JAVA_LANGUAGE).parse(code.encode("utf-8"))
+    return not tree.root_node.has_error
+
+# === Report ===
+def report(models=MODELS, datasets=DATASETS):
+    """Prompt tokens saved per dataset and model, and whether every compacted suite still parses."""
+    results = []
+    for model_dir, model_name in models.items():
+        for dataset_name in datasets:
+            totals = defaultdict(int)
+            for entry in load_entries(model_dir, dataset_name):
+                original = entry["test_code"]
+                compacted = compact_test_code(original, entry["Static_part_to_keep_from_EvoSuite"])
+                totals["suites"] += 1
+                totals["tokens_before"] += count_tokens(original, model_name)
+                totals["tokens_after"] += count_tokens(compacted, model_name)
+                totals["unchanged"] += compacted == original
+                if parses(original) and parses(compacted) is False:
+                    totals["parse_failures"] += 1
+            if not totals["suites"]:
+                continue
+            saved = totals["tokens_before"] - totals["tokens_after"]
+            results.append({
+                "model": model_dir,
+                "dataset": dataset_name,
+                **totals,
+                "tokens_saved": saved,
+                "saved_%": round(100 * saved / max(totals["tokens_before"], 1), 2)
+            })
+            print(f"[{model_dir}/{dataset_name}] {totals['suites']} suites: {totals['tokens_before']} -> "
+                  f"{totals['tokens_after']} test-code tokens ({results[-1]['saved_%']}% saved), "
+                  f"{totals['parse_failures']} parse failures")
+    with open(REPORT_PATH, "w") as f:
+        json.dump(results, f, indent=4)
+    return results
+
+def main():
+    selected = {name: MODELS[name] for name in sys.argv[1:]} or MODELS
+    report(selected)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import re
+import time
+import random
+import threading
+from contextlib import contextmanager
+import httpx
+
+# === Configuration ===
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+ADDITIVE_STEP = 1.0
+MULTIPLICATIVE_DECREASE = 0.5
+MAX_BACKOFF = 60.0
+
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+# Header names used by OpenAI (x-ratelimit-*-requests/tokens) and Mistral (*-minute, ratelimitbysize-*)
+REQUEST_HEADERS = {
+    "limit": ["x-ratelimit-limit-requests", "x-ratelimit-limit-req-minute"],
+    "remaining": ["x-ratelimit-remaining-requests", "x-ratelimit-remaining-req-minute"],
+    "reset": ["x-ratelimit-reset-requests"],
+}
+TOKEN_HEADERS = {
+    "limit": ["x-ratelimit-limit-tokens", "x-ratelimit-limit-tokens-minute", "ratelimitbysize-limit"],
+    "remaining": ["x-ratelimit-remaining-tokens", "x-ratelimit-remaining-tokens-minute", "ratelimitbysize-remaining"],
+    "reset": ["x-ratelimit-reset-tokens", "ratelimitbysize-reset"],
+}
+
+# === Header parsing ===
+def parse_duration(value):
+    """Parse '1s', '6m0s', '20ms' or a plain number of seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+def first_header(headers, names):
+    for name in names:
+        if name in headers:
+            return headers[name]
+    return None
+
+def to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+# === Error classification ===
+def error_status(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "raw_response", None), "status_code", None)
+    return status
+
+def classify_error(exc):
+    """Return RETRYABLE for throttling, timeouts and server errors, FATAL otherwise."""
+    status = error_status(exc)
+    if status is not None:
+        return RETRYABLE if status in (408, 409, 429) or status >= 500 else FATAL
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return RETRYABLE
+    if type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return RETRYABLE
+    return FATAL
+
+def retry_after(exc):
+    response = getattr(exc, "response", None) or getattr(exc, "raw_response", None)
+    headers = getattr(response, "headers", None) or {}
+    return parse_duration(headers.get("retry-after"))
+
+# === Controller ===
+class RateController:
+    """AIMD concurrency window plus request/token budgets read from provider headers.
+
+    The window grows by ADDITIVE_STEP per window of successful calls and is
+    halved on every 429. The remaining-requests/remaining-tokens headers are
+    account-wide, so parallel runners pace themselves on the same budget.
+    """
+
+    def __init__(self, initial_concurrency=2, min_concurrency=MIN_CONCURRENCY, max_concurrency=MAX_CONCURRENCY):
+        self.window = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.paused_until = 0.0
+        self.limit_requests = None
+        self.limit_tokens = None
+        self.throttled = 0
+        self.condition = threading.Condition()
+
+    def concurrency(self):
+        return max(self.min_concurrency, min(self.max_concurrency, int(self.window)))
+
+    def _wait_time(self, tokens):
+        now = time.time()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.remaining_requests is not None and self.remaining_requests <= 0 and now < self.requests_reset_at:
+            return self.requests_reset_at - now
+        if self.remaining_tokens is not None and self.remaining_tokens < tokens and now < self.tokens_reset_at:
+            return self.tokens_reset_at - now
+        return 0.0
+
+    def acquire(self, tokens=0):
+        with self.condition:
+            while True:
+                wait = self._wait_time(tokens)
+                if self.in_flight < self.concurrency() and wait <= 0:
+                    break
+                self.condition.wait(timeout=wait if wait > 0 else 1.0)
+            self.in_flight += 1
+            if self.remaining_requests is not None:
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                self.remaining_tokens -= tokens
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, tokens=0):
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self):
+        with self.condition:
+            self.window = min(self.max_concurrency, self.window + ADDITIVE_STEP / max(self.window, 1.0))
+            self.condition.notify_all()
+
+    def on_throttle(self, wait=None):
+        with self.condition:
+            self.throttled += 1
+            self.window = max(self.min_concurrency, self.window * MULTIPLICATIVE_DECREASE)
+            if wait:
+                self.paused_until = max(self.paused_until, time.time() + wait)
+
+    def observe_headers(self, headers):
+        now = time.time()
+        with self.condition:
+            limit = to_int(first_header(headers, REQUEST_HEADERS["limit"]))
+            remaining = to_int(first_header(headers, REQUEST_HEADERS["remaining"]))
+            reset = parse_duration(first_header(headers, REQUEST_HEADERS["reset"]))
+            if limit is not None:
+                self.limit_requests = limit
+            if remaining is not None:
+                self.remaining_requests = remaining
+                self.requests_reset_at = now + (reset if reset is not None else 60.0)
+
+            limit = to_int(first_header(headers, TOKEN_HEADERS["limit"]))
+            remaining = to_int(first_header(headers, TOKEN_HEADERS["remaining"]))
+            reset = parse_duration(first_header(headers, TOKEN_HEADERS["reset"]))
+            if limit is not None:
+                self.limit_tokens = limit
+            if remaining is not None:
+                self.remaining_tokens = remaining
+                self.tokens_reset_at = now + (reset if reset is not None else 60.0)
+            self.condition.notify_all()
+
+    def observe_response(self, response):
+        """httpx response hook: track budgets and react to 429 before the SDK raises."""
+        self.observe_headers(response.headers)
+        if response.status_code == 429:
+            self.on_throttle(parse_duration(response.headers.get("retry-after")))
+
+    def http_client(self, **kwargs):
+        return httpx.Client(event_hooks={"response": [self.observe_response]}, **kwargs)
+
+    def backoff(self, attempt, exc=None):
+        """Seconds to sleep before retry `attempt`: Retry-After if given, else jittered exponential."""
+        wait = retry_after(exc) if exc is not None else None
+        if wait is None:
+            wait = min(MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.0)
+        return wait
+
+    def summary(self):
+        return {
+            "concurrency": self.concurrency(),
+            "throttled": self.throttled,
+            "limit_requests": self.limit_requests,
+            "limit_tokens": self.limit_tokens,
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+        }
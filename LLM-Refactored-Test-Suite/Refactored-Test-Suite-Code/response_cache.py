@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from collections import defaultdict
+
+# === Configuration ===
+CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", "response_cache"))
+# Replay only: never call the API, a cache miss is reported as a failed request
+OFFLINE = os.getenv("LLM_CACHE_OFFLINE") == "1"
+
+# === Keys ===
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def cache_key(provider, model, temperature, max_tokens, prompt, sample):
+    """Content address of one sampled completion."""
+    material = json.dumps([provider, model, temperature, max_tokens, sha256(prompt), sample])
+    return sha256(material)
+
+# === Store ===
+class ResponseCache:
+    """Content-addressed store of raw completions: <root>/<key[:2]>/<key>.json."""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+
+    def path(self, key):
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self.path(key)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def put(self, key, record):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Per-thread temp file: runner threads may store the same key concurrently
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(record, f, indent=4)
+        os.replace(tmp, path)
+
+    def records(self):
+        for path in self.root.glob("*/*.json"):
+            with open(path, "r") as f:
+                yield json.load(f)
+
+def make_record(provider, model, temperature, max_tokens, prompt, sample, completion, usage, finish_reason=None):
+    return {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "prompt_sha256": sha256(prompt),
+        "sample": sample,
+        "completion": completion,
+        "usage": usage,
+        "finish_reason": finish_reason,
+        "created": int(time.time())
+    }
+
+# === Report ===
+def main():
+    totals = defaultdict(lambda: {"responses": 0, "prompt_tokens": 0, "completion_tokens": 0})
+    for record in ResponseCache().records():
+        stats = totals[(record["provider"], record["model"])]
+        usage = record.get("usage") or {}
+        stats["responses"] += 1
+        stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        stats["completion_tokens"] += usage.get("completion_tokens") or 0
+
+    for (provider, model), stats in sorted(totals.items()):
+        print(f"[{provider}/{model}] {stats['responses']} cached responses, "
+              f"{stats['prompt_tokens']} prompt + {stats['completion_tokens']} completion tokens replayable offline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import threading
+import multiprocessing
+from pathlib import Path
+from prompt_budget import extract_code
+from output_store import read_output
+
+# === Configuration ===
+# Set LLM_SCORE_INLINE=0 to only write the raw outputs
+SCORE_INLINE = os.getenv("LLM_SCORE_INLINE", "1") == "1"
+APPROACH_DIR = Path(__file__).resolve().parents[2] / "Approach"
+SCORE_DIR = Path("Scores/Scenario-1")
+REJECT_DIR = "rejects"
+# Three runner parts per model share the machine
+NUM_WORKERS = max(1, (os.cpu_count() or 3) // 3)
+QUEUE_FACTOR = 4
+NUM_ITERATIONS = 3
+
+# === Pairs ===
+def make_pair(entry, dataset_name, iteration, completion):
+    """EvoSuite original and refactored code of one output, with the identifiers of the metrics JSON."""
+    return {
+        "dataset": dataset_name,
+        "project_name": entry["project_name"],
+        "class": entry["class"],
+        "bug-id": entry.get("bug-id"),
+        "fqdn": entry.get("fqdn"),
+        "iteration_evosuite": str(entry.get("iteration", "")),
+        "iteration_refactored": f"iter-{iteration}",
+        "reference": entry["test_code"],
+        "prediction": extract_code(completion),
+        "static_part": entry["Static_part_to_keep_from_EvoSuite"]
+    }
+
+def pair_key(record):
+    return "|".join(str(record[field]) for field in
+                    ("project_name", "class", "bug-id", "iteration_evosuite", "iteration_refactored"))
+
+# === Metric workers ===
+def score_pair(pair, metrics):
+    """Record in the format of Results/CODEBLEU-METEOR-ROUGEL-ETC/*-UPDATED_*-metrics.json."""
+    preprocess, codebleu, meteor, rouge, ctses = metrics
+    result = codebleu(preprocess(pair["reference"]), preprocess(pair["prediction"]))
+    meteor_score = meteor(pair["reference"], pair["prediction"])
+    rouge_l = rouge(pair["reference"], pair["prediction"])
+    composite = ctses(result["codebleu"], meteor_score, rouge_l)
+    record = {field: pair[field] for field in
+              ("project_name", "class", "bug-id", "fqdn", "iteration_evosuite", "iteration_refactored")}
+    record.update({
+        "METEOR": round(meteor_score, 4),
+        "ROUGE-L": round(rouge_l, 4),
+        "CodeBLEU": round(result["codebleu"], 4),
+        "N-gram Match": round(result["ngram_match_score"], 4),
+        "Weighted N-gram Match": round(result["weighted_ngram_match_score"], 4),
+        "Syntax Match": round(result["syntax_match_score"], 4),
+        "Dataflow Match": round(result["dataflow_match_score"], 4),
+        "average_score_1": composite["CTSES_Avg"],
+        "CTSES_score_1": composite["CTSES_1"],
+        "CTSES_score_2": composite["CTSES_2"]
+    })
+    return record
+
+def metric_worker(tasks, results):
+    """Gate then score pairs from `tasks` with the Approach metric functions until the None sentinel.
+
+    Results are (dataset, kind, payload) with kind "record", "reject" or "error".
+    """
+    from syntax_gate import check_code
+    sys.path.insert(0, str(APPROACH_DIR))
+    from evaluate_test_similarity import (preprocess_java_code, calculate_codebleu, calculate_meteor,
+                                         calculate_rouge_l, compute_ctses, ensure_nltk)
+    ensure_nltk()
+    metrics = (preprocess_java_code, calculate_codebleu, calculate_meteor, calculate_rouge_l, compute_ctses)
+    while True:
+        pair = tasks.get()
+        if pair is None:
+            break
+        # Any failure, in the gate (e.g. grammar load) or the metrics, is reported so the worker keeps draining tasks
+        try:
+            # Unparsable or incomplete refactorings never reach the metrics
+            reasons = check_code(pair["prediction"], pair["static_part"])
+            if reasons:
+                results.put((pair["dataset"], "reject", {"key": pair_key(pair), "reasons": reasons}))
+                continue
+            results.put((pair["dataset"], "record", score_pair(pair, metrics)))
+        except Exception as e:
+            results.put((pair["dataset"], "error", f"{pair_key(pair)}: {type(e).__name__}: {e}"))
+
+# === Pipeline ===
+class ScoringPipeline:
+    """Score completions while generation goes on.
+
+    The runner threads `submit` each saved completion; the pair goes into a bounded
+    queue (a full queue blocks generation instead of piling up memory), metric
+    processes consume it, and a writer thread appends every record to
+    Scores/Scenario-1/<MODEL>/<dataset>/<runner>.jsonl as soon as it is scored.
+    """
+
+    def __init__(self, model_dir, runner, workers=NUM_WORKERS):
+        self.model_dir = model_dir
+        self.runner = runner
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue(maxsize=QUEUE_FACTOR * workers)
+        self.results = context.Queue()
+        self.scored = {}
+        self.counts = {"record": 0, "reject": 0, "error": 0}
+        self.workers = [context.Process(target=metric_worker, args=(self.tasks, self.results), daemon=True)
+                        for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+        self.writer = threading.Thread(target=self.write_records, daemon=True)
+        self.writer.start()
+
+    def score_path(self, dataset_name):
+        return SCORE_DIR / self.model_dir / dataset_name / f"{self.runner}.jsonl"
+
+    def already_scored(self, dataset_name):
+        if dataset_name not in self.scored:
+            self.scored[dataset_name] = {pair_key(record) for record in load_records(self.model_dir, dataset_name)}
+        return self.scored[dataset_name]
+
+    def submit(self, entry, dataset_name, iteration, completion):
+        pair = make_pair(entry, dataset_name, iteration, completion)
+        if pair_key(pair) not in self.already_scored(dataset_name):
+            self.tasks.put(pair)
+
+    def write_records(self):
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            dataset_name, kind, payload = item
+            self.counts[kind] += 1
+            if kind == "error":
+                path, line = SCORE_DIR / self.model_dir / dataset_name / "errors.log", payload
+            elif kind == "reject":
+                path = SCORE_DIR / self.model_dir / dataset_name / REJECT_DIR / f"{self.runner}.jsonl"
+                line = json.dumps(payload)
+            else:
+                path, line = self.score_path(dataset_name), json.dumps(payload)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a") as f:
+                f.write(line + "\n")
+
+    def close(self):
+        """Wait for the queued pairs to be scored and written."""
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.results.put(None)
+        self.writer.join()
+        print(f"[SCORE] {self.model_dir}/{self.runner}: {self.counts['record']} records written, "
+              f"{self.counts['reject']} rejected by the syntax gate, {self.counts['error']} failed")
+
+# === Results ===
+def load_records(model_dir, dataset_name):
+    records = []
+    for path in sorted((SCORE_DIR / model_dir / dataset_name).glob("*.jsonl")):
+        with open(path, "r") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+def export_metrics(model_dir, dataset_name):
+    """Write `<MODEL>-UPDATED_<dataset>-Scenario-1-metrics.json`, one record per output, as in Results/."""
+    records = {pair_key(record): record for record in load_records(model_dir, dataset_name)}
+    if not records:
+        return
+    ordered = sorted(records.values(), key=lambda r: (r["project_name"], r["class"], str(r["bug-id"]),
+                                                      r["iteration_evosuite"], r["iteration_refactored"]))
+    path = SCORE_DIR / f"{model_dir}-UPDATED_{dataset_name}-Scenario-1-metrics.json"
+    with open(path, "w") as f:
+        json.dump(ordered, f, indent=4)
+    print(f"[SCORE] {len(ordered)} records -> {path}")
+
+def backfill(model_name, datasets):
+    """Score outputs written without the inline stage (earlier runs, batch mode), then export."""
+    from sharding import load_entries
+    from batch_mode import load_runner, RUNNERS
+
+    runner = load_runner(model_name)
+    model_dir = RUNNERS[model_name]["model_dir"]
+    pipeline = ScoringPipeline(model_dir, "backfill")
+    for dataset in datasets:
+        for entry in load_entries(model_dir, dataset["name"]):
+            for iteration in range(1, NUM_ITERATIONS + 1):
+                out_path, filename = runner.output_location(entry, dataset["name"], dataset["has_bug_id"], iteration)
+                completion = read_output(out_path / filename)
+                if completion is not None:
+                    pipeline.submit(entry, dataset["name"], iteration, completion)
+    pipeline.close()
+    for dataset in datasets:
+        export_metrics(model_dir, dataset["name"])
+
+def main():
+    from batch_mode import DATASETS
+    models = sys.argv[1:] or ["gpt", "mistral"]
+    for model_name in models:
+        backfill(model_name, DATASETS)
+
+if __name__ == "__main__":
+    main()
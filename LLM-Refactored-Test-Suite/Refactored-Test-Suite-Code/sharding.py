@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+import hashlib
+import heapq
+from functools import lru_cache
+from pathlib import Path
+import tiktoken
+from corpus import open_corpus
+
+# === Configuration ===
+encoding = tiktoken.encoding_for_model("gpt-4o")
+
+DATASET_DIR = Path(__file__).resolve().parent / "DATASET"
+CLAIM_DIR = Path("shard_claims")
+STATS_DIR = Path("shard_stats")
+STATIC_PARTS = 3
+
+# === Dataset loading ===
+_corpora = {}
+
+def load_corpus(model, dataset_name):
+    """Indexed corpus of a model's `<dataset>_partN.json` files, rebuilt when a part file changes."""
+    sources = sorted((DATASET_DIR / model).glob(f"{dataset_name}_part*.json"))
+    if not sources:
+        return None
+    if (model, dataset_name) not in _corpora:
+        path = DATASET_DIR / model / f"{dataset_name}.corpus"
+        _corpora[model, dataset_name] = open_corpus(path, sources, derived={"prompt_tokens": entry_cost})
+    return _corpora[model, dataset_name]
+
+def load_entries(model, dataset_name):
+    """Every `<dataset>_partN.json` of a model as one work queue; test code is read on access."""
+    corpus = load_corpus(model, dataset_name)
+    return list(corpus) if corpus else []
+
+def load_static_parts(model, dataset_name):
+    """Return the entries of each fixed part file, in part order."""
+    corpus = load_corpus(model, dataset_name)
+    return [corpus.part(number) for number in range(len(corpus.sources))] if corpus else []
+
+def entry_key(entry):
+    return (entry["project_name"], entry["class"], str(entry.get("bug-id", "")), str(entry.get("iteration", "")))
+
+@lru_cache(maxsize=None)
+def count_tokens(text):
+    return len(encoding.encode(text))
+
+def entry_cost(entry):
+    """Prompt tokens contributed by an entry (test code + static EvoSuite part)."""
+    # Counted once when the corpus is built
+    cost = getattr(entry, "derived", {}).get("prompt_tokens")
+    if cost is not None:
+        return cost
+    return count_tokens(entry["test_code"]) + count_tokens(entry["Static_part_to_keep_from_EvoSuite"])
+
+# === Scheduling ===
+def lpt_schedule(costs, num_workers):
+    """Longest-processing-time assignment: each job goes to the least loaded worker."""
+    heap = [(0, worker) for worker in range(num_workers)]
+    assignment = [[] for _ in range(num_workers)]
+    loads = [0] * num_workers
+    for index in sorted(range(len(costs)), key=lambda i: costs[i], reverse=True):
+        load, worker = heapq.heappop(heap)
+        assignment[worker].append(index)
+        loads[worker] = load + costs[index]
+        heapq.heappush(heap, (loads[worker], worker))
+    return assignment, loads
+
+def claim_entries(entries, queue_name, model):
+    """Yield the entries this process wins, longest first.
+
+    Every runner walks the same longest-first queue and claims an entry by
+    atomically creating its claim file, so an idle runner keeps taking work
+    until the queue is empty (greedy LPT list scheduling).
+    """
+    claim_dir = CLAIM_DIR / model / queue_name
+    claim_dir.mkdir(parents=True, exist_ok=True)
+    costs = [entry_cost(entry) for entry in entries]
+    for index in sorted(range(len(entries)), key=lambda i: costs[i], reverse=True):
+        token = hashlib.sha1("|".join(entry_key(entries[index])).encode("utf-8")).hexdigest()
+        try:
+            fd = os.open(claim_dir / f"{token}.claim", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        yield entries[index], costs[index]
+
+# === Makespan tracking ===
+class WorkerStats:
+    """Accumulates the tokens and wall time processed by one runner."""
+
+    def __init__(self, model, worker):
+        self.model = model
+        self.worker = worker
+        self.started = time.time()
+        self.tokens = 0
+        self.entries = 0
+
+    def record(self, cost):
+        self.tokens += cost
+        self.entries += 1
+
+    def save(self):
+        STATS_DIR.mkdir(exist_ok=True)
+        with open(STATS_DIR / f"{self.model}_{self.worker}.json", "w") as f:
+            json.dump({
+                "model": self.model,
+                "worker": self.worker,
+                "entries": self.entries,
+                "tokens": self.tokens,
+                "makespan_s": round(time.time() - self.started, 2)
+            }, f, indent=4)
+
+# === Report ===
+def report(model, datasets):
+    """Compare the static part split with the token-balanced schedule."""
+    static_loads = [0] * STATIC_PARTS
+    costs = []
+    for dataset_name in datasets:
+        for part, data in enumerate(load_static_parts(model, dataset_name)):
+            part_costs = [entry_cost(entry) for entry in data]
+            static_loads[part % STATIC_PARTS] += sum(part_costs)
+            costs.extend(part_costs)
+    if not costs:
+        return
+
+    _, balanced_loads = lpt_schedule(costs, STATIC_PARTS)
+    print(f"[{model}] {len(costs)} entries, {sum(costs)} prompt tokens")
+    print(f"  Static split tokens per worker : {static_loads} (makespan {max(static_loads)})")
+    print(f"  LPT schedule tokens per worker : {balanced_loads} (makespan {max(balanced_loads)})")
+
+    for stats_file in sorted(STATS_DIR.glob(f"{model}_*.json")):
+        with open(stats_file, "r") as f:
+            stats = json.load(f)
+        print(f"  Measured {stats['worker']}: {stats['entries']} entries, {stats['tokens']} tokens, makespan {stats['makespan_s']} s")
+
+def main():
+    for model in sys.argv[1:] or ["GPT", "MISTRAL"]:
+        report(model, ["Defects4J", "SF110"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from statistics import quantiles
+from collections import defaultdict
+from prompt_budget import scan_code, count_tokens, get_tokenizer
+
+# === Configuration ===
+# Set LLM_STREAM=0 to fall back to blocking requests
+STREAM = os.getenv("LLM_STREAM", "1") == "1"
+LATENCY_LOG = Path("logs") / "stream_latency.jsonl"
+OPEN_FENCE = re.compile(r"```[ \t]*(?:java)?[ \t]*\n", re.IGNORECASE)
+# Longest opening-fence line kept unscanned while waiting for its newline
+FENCE_LOOKBACK = 32
+
+log_lock = threading.Lock()
+
+# === Incremental fence extraction ===
+def is_complete_class(code):
+    """True if the code opens at least one block and closes every block it opens."""
+    depth, opened = 0, False
+    for _, c, depth in scan_code(code):
+        opened = opened or c == "{"
+    return opened and depth == 0
+
+class FenceExtractor:
+    """Follow a streamed completion until the fenced block holding a complete class is closed."""
+
+    def __init__(self):
+        self.text = ""
+        self.code_start = None
+        self.scan = 0
+        self.end = None
+
+    @property
+    def done(self):
+        return self.end is not None
+
+    def feed(self, delta):
+        """Append a delta; return True once the closing fence of the code block has arrived."""
+        self.text += delta
+        while self.end is None:
+            if self.code_start is None:
+                match = OPEN_FENCE.search(self.text, self.scan)
+                if not match:
+                    self.scan = max(self.scan, len(self.text) - FENCE_LOOKBACK)
+                    return False
+                self.code_start = self.scan = match.end()
+            closing = self.text.find("```", self.scan)
+            if closing == -1:
+                self.scan = max(self.scan, len(self.text) - 2)
+                return False
+            if is_complete_class(self.text[self.code_start:closing]):
+                self.end = closing + 3
+            else:
+                # A short snippet, not the refactored class: look for the next block
+                self.code_start, self.scan = None, closing + 3
+        return True
+
+    def completion(self):
+        return self.text[:self.end] if self.done else self.text
+
+# === Stream consumption ===
+def consume(events, read_event, start):
+    """Read (delta, finish_reason, usage) from each event until the code fence closes or the stream ends."""
+    extractor = FenceExtractor()
+    first = last = None
+    finish_reason, usage = None, None
+    for event in events:
+        delta, finish, event_usage = read_event(event)
+        usage = event_usage or usage
+        finish_reason = finish or finish_reason
+        if delta:
+            last = time.perf_counter()
+            first = first or last
+            if extractor.feed(delta):
+                finish_reason = "fence"
+                break
+    return {
+        "completion": extractor.completion(),
+        "finish_reason": finish_reason,
+        "usage": usage,
+        "ttft": None if first is None else first - start,
+        "ttlt": None if last is None else last - start,
+        "stopped_early": extractor.done
+    }
+
+def estimate_usage(result, prompt, model):
+    """Streams cancelled at the fence carry no usage chunk: count the tokens received instead."""
+    if result["usage"] is None:
+        result["usage"] = {
+            "prompt_tokens": count_tokens(prompt, model),
+            # Each completion is counted once: encoded directly, it stays out of the count_tokens cache
+            "completion_tokens": len(get_tokenizer(model)[0](result["completion"])),
+            "estimated": True
+        }
+    return result
+
+def read_openai_chunk(chunk):
+    usage = chunk.usage.model_dump() if chunk.usage else None
+    if not chunk.choices:
+        return None, None, usage
+    choice = chunk.choices[0]
+    return choice.delta.content, choice.finish_reason, usage
+
+def read_mistral_event(event):
+    chunk = event.data
+    usage = chunk.usage.model_dump() if chunk.usage else None
+    if not chunk.choices:
+        return None, None, usage
+    choice = chunk.choices[0]
+    content = choice.delta.content
+    return (content if isinstance(content, str) else None), choice.finish_reason, usage
+
+# === Provider calls ===
+def complete_openai(client, model, prompt, max_tokens, temperature):
+    """Return completion, usage, finish_reason and timings; leaving the `with` closes the stream early."""
+    messages = [{"role": "user", "content": prompt}]
+    start = time.perf_counter()
+    if not STREAM:
+        response = client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature)
+        elapsed = time.perf_counter() - start
+        return {"completion": response.choices[0].message.content, "finish_reason": response.choices[0].finish_reason,
+                "usage": response.usage.model_dump() if response.usage else None,
+                "ttft": None, "ttlt": elapsed, "stopped_early": False}
+
+    with client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                                        stream=True, stream_options={"include_usage": True}) as stream:
+        result = consume(stream, read_openai_chunk, start)
+    return estimate_usage(result, prompt, model)
+
+def complete_mistral(client, model, prompt, max_tokens, temperature):
+    messages = [{"role": "user", "content": prompt}]
+    start = time.perf_counter()
+    if not STREAM:
+        response = client.chat.complete(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+        elapsed = time.perf_counter() - start
+        return {"completion": response.choices[0].message.content, "finish_reason": response.choices[0].finish_reason,
+                "usage": response.usage.model_dump() if response.usage else None,
+                "ttft": None, "ttlt": elapsed, "stopped_early": False}
+
+    with client.chat.stream(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens) as stream:
+        result = consume(stream, read_mistral_event, start)
+    return estimate_usage(result, prompt, model)
+
+# === Latency log ===
+def record_latency(provider, model, result):
+    LATENCY_LOG.parent.mkdir(exist_ok=True)
+    line = json.dumps({
+        "provider": provider,
+        "model": model,
+        "ttft": result["ttft"],
+        "ttlt": result["ttlt"],
+        "stopped_early": result["stopped_early"],
+        "finish_reason": result["finish_reason"],
+        "completion_tokens": (result["usage"] or {}).get("completion_tokens")
+    })
+    with log_lock, open(LATENCY_LOG, "a") as f:
+        f.write(line + "\n")
+
+def percentiles(values):
+    if len(values) < 2:
+        return (values[0], values[0]) if values else (None, None)
+    cuts = quantiles(values, n=20, method="inclusive")
+    return cuts[9], cuts[18]
+
+def main():
+    """Summarize time-to-first/last-token and early stops per provider and model."""
+    groups = defaultdict(list)
+    if LATENCY_LOG.exists():
+        with open(LATENCY_LOG, "r") as f:
+            for line in f:
+                record = json.loads(line)
+                groups[(record["provider"], record["model"])].append(record)
+
+    for (provider, model), records in sorted(groups.items()):
+        ttft = percentiles([r["ttft"] for r in records if r["ttft"] is not None])
+        ttlt = percentiles([r["ttlt"] for r in records if r["ttlt"] is not None])
+        early = sum(r["stopped_early"] for r in records)
+        fmt = lambda value: "n/a" if value is None else f"{value:.2f}s"
+        print(f"[{provider}/{model}] {len(records)} calls | TTFT p50 {fmt(ttft[0])} p95 {fmt(ttft[1])} | "
+              f"TTLT p50 {fmt(ttlt[0])} p95 {fmt(ttlt[1])} | {early} stopped at the closing fence")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from prompt_budget import extract_code
+from output_store import read_output
+from prompt_compaction import code_tokens, JAVA_LANGUAGE
+
+# === Configuration ===
+MAX_REPORTED_NODES = 5
+CHUNK_SIZE = 64
+NUM_ITERATIONS = 3
+
+_parser = None
+
+# === Parse check ===
+def get_parser():
+    """One tree-sitter parser per process."""
+    global _parser
+    if JAVA_LANGUAGE is None:
+        raise ImportError("the syntax gate needs tree-sitter and tree-sitter-java")
+    if _parser is None:
+        from tree_sitter import Parser
+        _parser = Parser(JAVA_LANGUAGE)
+    return _parser
+
+def syntax_problems(code):
+    """ERROR and MISSING nodes of the parse tree, as 'ERROR at line:col' strings."""
+    tree = get_parser().parse(code.encode("utf-8"))
+    if not tree.root_node.has_error:
+        return []
+    problems, stack = [], [tree.root_node]
+    while stack and len(problems) < MAX_REPORTED_NODES:
+        node = stack.pop()
+        if node.is_missing:
+            problems.append(f"MISSING {node.type} at {node.start_point[0] + 1}:{node.start_point[1] + 1}")
+        elif node.type == "ERROR":
+            problems.append(f"ERROR at {node.start_point[0] + 1}:{node.start_point[1] + 1}")
+            continue
+        # Only subtrees containing an error are visited, in source order
+        stack.extend(child for child in reversed(node.children) if child.has_error or child.is_missing)
+    return problems
+
+# === Static part check ===
+def static_elements(static_part):
+    """Split the EvoSuite static part into package/import statements, annotations and the class declaration."""
+    tokens = code_tokens(static_part)
+    elements, i = [], 0
+    while i < len(tokens):
+        if tokens[i] in ("package", "import"):
+            end = tokens.index(";", i) + 1 if ";" in tokens[i:] else len(tokens)
+        elif tokens[i] == "@":
+            end = i + 2
+            while end + 1 < len(tokens) and tokens[end] == ".":
+                end += 2
+            if end < len(tokens) and tokens[end] == "(":
+                depth = 0
+                for k in range(end, len(tokens)):
+                    depth += {"(": 1, ")": -1}.get(tokens[k], 0)
+                    if depth == 0:
+                        end = k + 1
+                        break
+        else:
+            end = tokens.index("{", i) if "{" in tokens[i:] else len(tokens)
+            if end == i:
+                i += 1
+                continue
+        elements.append(" ".join(tokens[i:end]))
+        i = end
+    return elements
+
+def missing_static(code, static_part):
+    text = f" {' '.join(code_tokens(code))} "
+    return [element for element in static_elements(static_part) if f" {element} " not in text]
+
+# === Gate ===
+def check_code(code, static_part):
+    """Reasons to reject an extracted refactoring; an empty list means it may be scored."""
+    if not code.strip():
+        return ["empty output"]
+    reasons = [f"syntax: {problem}" for problem in syntax_problems(code)]
+    reasons += [f"static part lost: {element}" for element in missing_static(code, static_part)]
+    return reasons
+
+def check_output(item):
+    item_id, completion, static_part = item
+    return item_id, check_code(extract_code(completion), static_part)
+
+def gate(items, workers=None):
+    """Check (id, completion, static_part) items in parallel; yield (id, reasons) in input order."""
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        yield from pool.map(check_output, items, chunksize=CHUNK_SIZE)
+
+# === Entry point ===
+def main():
+    """Gate every saved output of a model and write the reject list of each dataset."""
+    from sharding import load_entries
+    from batch_mode import load_runner, RUNNERS, DATASETS
+    from scoring_pipeline import SCORE_DIR, make_pair, pair_key, REJECT_DIR
+
+    for model_name in sys.argv[1:] or ["gpt", "mistral"]:
+        runner = load_runner(model_name)
+        model_dir = RUNNERS[model_name]["model_dir"]
+        for dataset in DATASETS:
+            items, outputs = [], {}
+            for entry in load_entries(model_dir, dataset["name"]):
+                for iteration in range(1, NUM_ITERATIONS + 1):
+                    out_path, filename = runner.output_location(entry, dataset["name"], dataset["has_bug_id"], iteration)
+                    completion = read_output(out_path / filename)
+                    if completion is None:
+                        continue
+                    pair = make_pair(entry, dataset["name"], iteration, completion)
+                    outputs[pair_key(pair)] = str(out_path / filename)
+                    items.append((pair_key(pair), completion, entry["Static_part_to_keep_from_EvoSuite"]))
+            if not items:
+                continue
+
+            reasons_count, rejected = Counter(), 0
+            reject_path = SCORE_DIR / model_dir / dataset["name"] / REJECT_DIR / "syntax_gate.jsonl"
+            reject_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(reject_path, "w") as f:
+                for key, reasons in gate(items):
+                    if not reasons:
+                        continue
+                    rejected += 1
+                    reasons_count.update(reason.split(":")[0] for reason in reasons)
+                    f.write(json.dumps({"key": key, "output": outputs[key], "reasons": reasons}) + "\n")
+            print(f"[GATE] {model_dir}/{dataset['name']}: {rejected}/{len(items)} outputs rejected "
+                  f"({dict(reasons_count)}) -> {reject_path}")
+
+if __name__ == "__main__":
+    main()
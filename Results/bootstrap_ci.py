@@ -0,0 +1,109 @@
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from results_store import load_results, RESULTS_DIR, MODELS, DATASETS, MODEL_LABELS, SIMILARITY_METRICS, CTSES_METRICS
+from stats_engine import lerp
+
+# === Configuration ===
+METRICS = SIMILARITY_METRICS + CTSES_METRICS
+QUANTILES = {"Q1": 0.25, "Median": 0.5, "Q3": 0.75}
+RESAMPLES = 10_000
+CONFIDENCE = 0.95
+SEED = 42
+# Upper bound on the entries of one chunk of the index matrix (4M int64 = 32 MB)
+CHUNK_ELEMENTS = 1 << 22
+OUTPUT_CI = RESULTS_DIR / "bootstrap_ci.csv"
+OUTPUT_DIFFERENCES = RESULTS_DIR / "bootstrap_model_differences.csv"
+
+# === Bootstrap ===
+def bootstrap(values, resamples=RESAMPLES, seed=SEED, quantiles=QUANTILES, chunk_elements=CHUNK_ELEMENTS):
+    """Bootstrap replicates of the mean and the quantiles of every column of `values` (n pairs x M metrics).
+
+    Resamples are drawn in chunks of rows of an index matrix into 0..n-1 and each
+    index addresses a position in the column sorted independently per metric. Each
+    row is sorted once, so row k of the sorted matrix is the k-th order statistic
+    of the resample for every metric at once. Quantiles then reduce to column
+    gathers and the means of all metrics to one product of the per-row index
+    counts with the sorted data.
+    Returns {"Mean": (resamples x M), "Q1": ..., ...}.
+    """
+    n, m = values.shape
+    ordered = np.sort(values, axis=0)
+    positions = np.array(list(quantiles.values())) * (n - 1)
+    lows = np.floor(positions).astype(np.int64)
+    highs = np.minimum(lows + 1, n - 1)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, chunk_elements // n)
+    replicates = {name: np.empty((resamples, m)) for name in ["Mean", *quantiles]}
+    for start in range(0, resamples, chunk):
+        size = min(chunk, resamples - start)
+        index = rng.integers(0, n, size=(size, n))
+        counts = np.bincount((index + n * np.arange(size)[:, None]).ravel(), minlength=size * n).reshape(size, n)
+        replicates["Mean"][start:start + size] = counts @ ordered / n
+        index.sort(axis=1)
+        for name, low, high, position in zip(quantiles, lows, highs, positions):
+            replicates[name][start:start + size] = lerp(ordered[index[:, low]], ordered[index[:, high]], position - low)
+    return replicates
+
+def point_estimates(values, quantiles=QUANTILES):
+    estimates = {"Mean": values.mean(axis=0)}
+    for name, q in quantiles.items():
+        estimates[name] = np.percentile(values, 100 * q, axis=0)
+    return estimates
+
+def interval(replicates, confidence=CONFIDENCE):
+    """Percentile bootstrap interval of each column."""
+    alpha = (1 - confidence) / 2
+    return np.percentile(replicates, [100 * alpha, 100 * (1 - alpha)], axis=0)
+
+# === Entry point ===
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals of every metric and CTSES score.")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    table = load_results()
+    started = time.perf_counter()
+    rows, replicates, estimates = [], {}, {}
+    for d, dataset in enumerate(DATASETS):
+        for m, model in enumerate(MODELS):
+            values = np.column_stack([table[metric][table.select(model, dataset)] for metric in METRICS])
+            values = values[~np.isnan(values).any(axis=1)]
+            # One stream per group, so a group's intervals do not depend on the other groups
+            replicates[dataset, model] = bootstrap(values, args.resamples, [args.seed, d, m])
+            estimates[dataset, model] = point_estimates(values)
+            for statistic, samples in replicates[dataset, model].items():
+                low, high = interval(samples, args.confidence)
+                for i, metric in enumerate(METRICS):
+                    rows.append({"Dataset": dataset, "Model": MODEL_LABELS[model], "Metric": metric,
+                                 "Statistic": statistic, "N": len(values),
+                                 "Estimate": estimates[dataset, model][statistic][i],
+                                 "CI Low": low[i], "CI High": high[i]})
+    print(f"{args.resamples} resamples of {len(METRICS)} metrics over {len(table)} pairs "
+          f"in {time.perf_counter() - started:.1f} s")
+
+    differences = []
+    first, second = MODELS
+    for dataset in DATASETS:
+        for statistic in replicates[dataset, first]:
+            delta = replicates[dataset, first][statistic] - replicates[dataset, second][statistic]
+            low, high = interval(delta, args.confidence)
+            for i, metric in enumerate(METRICS):
+                differences.append({
+                    "Dataset": dataset, "Metric": metric, "Statistic": statistic,
+                    "Difference": f"{MODEL_LABELS[first]} - {MODEL_LABELS[second]}",
+                    "Estimate": estimates[dataset, first][statistic][i] - estimates[dataset, second][statistic][i],
+                    "CI Low": low[i], "CI High": high[i], "Excludes 0": bool(low[i] > 0 or high[i] < 0)
+                })
+
+    pd.DataFrame(rows).to_csv(OUTPUT_CI, index=False, float_format="%.4f")
+    pd.DataFrame(differences).to_csv(OUTPUT_DIFFERENCES, index=False, float_format="%.4f")
+    print(f"- {OUTPUT_CI.name}\n- {OUTPUT_DIFFERENCES.name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from results_store import load_results, RESULTS_DIR, MODELS, DATASETS, MODEL_LABELS, VALUE_COLUMNS, COSINE_METRICS
+from bootstrap_ci import interval, CONFIDENCE, SEED
+
+# === Configuration ===
+METHODS = ["Pearson", "Spearman", "Kendall"]
+# Pearson and Spearman intervals are opt-in: 1000 resamples take about 20 s against 0.6 s for the matrices
+RESAMPLES = 0
+# Upper bound on the entries of one chunk of resampled ranks (resamples x metrics x pairs)
+CHUNK_ELEMENTS = 1 << 21
+MIN_PAIRS = 3
+# Metrics of the printed summary matrix
+FOCUS = ["METEOR", "ROUGE-L", "CodeBLEU", "CTSES_score_1"] + COSINE_METRICS
+OUTPUT = RESULTS_DIR / "correlation_matrices.csv"
+
+# === Ranks ===
+def rank_columns(values):
+    """Dense ranks (0..) and average ranks (1..n, as scipy's rankdata) of every column.
+
+    One argsort per column; ties are runs of equal values in the sorted column.
+    """
+    n, m = values.shape
+    order = np.argsort(values, axis=0, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=0)
+    new_run = np.vstack([np.ones((1, m), dtype=bool), ordered[1:] != ordered[:-1]])
+    dense_sorted = np.cumsum(new_run, axis=0) - 1
+    # Average rank of a run = mean of its 1-based positions = (first + last) / 2
+    positions = np.arange(1, n + 1)[:, None]
+    first = np.maximum.accumulate(np.where(new_run, positions, 0), axis=0)
+    last_run = np.vstack([new_run[1:], np.ones((1, m), dtype=bool)])
+    last = np.flip(np.minimum.accumulate(np.flip(np.where(last_run, positions, n + 1), axis=0), axis=0), axis=0)
+    dense, average = np.empty_like(dense_sorted), np.empty((n, m))
+    np.put_along_axis(dense, order, dense_sorted, axis=0)
+    np.put_along_axis(average, order, (first + last) / 2, axis=0)
+    return dense, average
+
+def tie_pairs(dense):
+    """Number of tied pairs in each column of dense ranks."""
+    counts = np.apply_along_axis(np.bincount, 0, dense, minlength=len(dense)) if dense.ndim == 2 else np.bincount(dense)
+    return (counts * (counts - 1) // 2).sum(axis=0)
+
+# === Correlations ===
+def pearson(values):
+    centered = values - values.mean(axis=0)
+    scale = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (centered.T @ centered) / np.outer(scale, scale)
+
+def inversions(sequences):
+    """Pairs i < j with s[i] > s[j] in each row of `sequences` (rows x n integer ranks below n).
+
+    Bottom-up merge sort over all rows at once. At each level, adjacent sorted blocks
+    are merged with a stable argsort, which on two sorted runs is a linear merge.
+    Ties keep left items first, so the right items merged ahead of a left item are
+    the ones smaller than it: summed over the left items, that is their merged
+    positions minus their own positions.
+    """
+    rows, n = sequences.shape
+    size = 1 << max(0, (n - 1).bit_length())
+    # Padding with n (above every rank) at the end adds no inversion
+    blocks = np.hstack([sequences, np.full((rows, size - n), n, dtype=sequences.dtype)])
+    total = np.zeros(rows, dtype=np.int64)
+    width = 1
+    while width < size:
+        pairs = blocks.reshape(rows, size // (2 * width), 2 * width)
+        order = np.argsort(pairs, axis=2, kind="stable")
+        left_positions = (order < width).reshape(-1, 2 * width).astype(np.float64) @ np.arange(2 * width, dtype=np.float64)
+        total += np.rint(left_positions.reshape(rows, -1).sum(axis=1)).astype(np.int64)
+        total -= pairs.shape[1] * (width * (width - 1) // 2)
+        blocks = np.take_along_axis(pairs, order, axis=2).reshape(rows, size)
+        width *= 2
+    return total
+
+def kendall(dense, pairs):
+    """Kendall tau-b of every (i, j) in `pairs` from dense ranks, in O(n log n) per pair (Knight, 1966).
+
+    Each pair's rows are sorted by (x, y) through the combined key x * n + y; the
+    discordant pairs are then the inversions of y, counted for all pairs at once.
+    """
+    n = len(dense)
+    if not len(pairs):
+        return np.empty(0)
+    first, second = np.asarray(pairs).T
+    keys = dense[:, first] * n + dense[:, second]
+    order = np.argsort(keys, axis=0, kind="stable")
+    swaps = inversions(np.take_along_axis(dense[:, second], order, axis=0).T)
+    total = n * (n - 1) // 2
+    ties = tie_pairs(dense)
+    sorted_keys = np.take_along_axis(keys, order, axis=0)
+    # Pairs tied on both x and y: runs of equal combined keys
+    joint = np.vstack([np.ones((1, len(first)), dtype=bool), sorted_keys[1:] != sorted_keys[:-1]])
+    run_ids = np.cumsum(joint, axis=0) - 1
+    joint_ties = tie_pairs(run_ids)
+    tx, ty = ties[first], ties[second]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (total - tx - ty + joint_ties - 2 * swaps) / np.sqrt((total - tx) * (total - ty))
+
+def weighted_pearson(columns, weights):
+    """Pearson matrix of `columns` (1 or resamples x m x n) under each row of `weights` (resamples x n)."""
+    totals = weights.sum(axis=1)[:, None]
+    weighted = columns * weights[:, None, :]
+    means = weighted.sum(axis=2) / totals
+    covariance = weighted @ columns.transpose(0, 2, 1) / totals[:, :, None] - means[:, :, None] * means[:, None, :]
+    scale = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return covariance / (scale[:, :, None] * scale[:, None, :])
+
+def weighted_ranks(dense, weights):
+    """Average ranks (resamples x m x n) of each resample given as row counts, from the dense ranks.
+
+    A value's rank in a resample is the weight drawn below it plus (c + 1) / 2 for
+    its own tie run of weight c. Run weights of all resamples and columns are one
+    bincount over (resample, column, dense rank), so no resample is sorted again.
+    """
+    n, m = dense.shape
+    index = (np.arange(len(weights))[:, None, None] * m + np.arange(m)[:, None]) * n + dense.T
+    counts = np.bincount(index.ravel(), weights=np.broadcast_to(weights[:, None, :], index.shape).ravel(),
+                         minlength=index.size).reshape(index.shape)
+    run_rank = np.cumsum(counts, axis=2) - (counts - 1) / 2
+    return run_rank.ravel()[index]
+
+def bootstrap_correlations(values, dense, resamples, seed, chunk_elements=CHUNK_ELEMENTS):
+    """Pearson and Spearman replicates (resamples x m x m), each resample drawn as multinomial row counts."""
+    n, m = values.shape
+    rng = np.random.default_rng(seed)
+    replicates = {"Pearson": np.empty((resamples, m, m)), "Spearman": np.empty((resamples, m, m))}
+    chunk = max(1, chunk_elements // (n * m))
+    for start in range(0, resamples, chunk):
+        size = min(chunk, resamples - start)
+        weights = rng.multinomial(n, np.full(n, 1 / n), size=size).astype(np.float64)
+        replicates["Pearson"][start:start + size] = weighted_pearson(values.T[None], weights)
+        replicates["Spearman"][start:start + size] = weighted_pearson(weighted_ranks(dense, weights), weights)
+    return replicates
+
+# === Matrices ===
+def row_sets(values):
+    """Rows shared by each pair of columns, grouped: [(row mask, [(i, j), ...])].
+
+    Columns with the same missing rows share one row set, so ranks are computed once
+    per (column, row set) instead of once per pair; usually there is a single set.
+    """
+    present = ~np.isnan(values)
+    blocks = {}
+    for i in range(values.shape[1]):
+        for j in range(i + 1, values.shape[1]):
+            rows = present[:, i] & present[:, j]
+            key = rows.tobytes()
+            blocks.setdefault(key, (rows, []))[1].append((i, j))
+    return list(blocks.values())
+
+def correlation_matrices(values, resamples=0, seed=SEED, confidence=CONFIDENCE):
+    """Pearson, Spearman and Kendall tau-b of every pair of columns, on the rows both have.
+
+    Returns {method: (estimate, count, low, high)}, each an m x m matrix (NaN where
+    a pair has fewer than MIN_PAIRS rows; intervals for Pearson / Spearman only).
+    """
+    m = values.shape[1]
+    results = {method: tuple(np.full((m, m), np.nan) for _ in range(4)) for method in METHODS}
+    for method in METHODS:
+        np.fill_diagonal(results[method][0], 1.0)
+    for block, (rows, pairs) in enumerate(row_sets(values)):
+        if rows.sum() < MIN_PAIRS:
+            continue
+        columns = sorted({c for pair in pairs for c in pair})
+        local = {c: k for k, c in enumerate(columns)}
+        data = values[rows][:, columns]
+        dense, average = rank_columns(data)
+        first, second = np.array([(local[i], local[j]) for i, j in pairs]).T
+        estimates = {"Pearson": pearson(data)[first, second], "Spearman": pearson(average)[first, second],
+                     "Kendall": kendall(dense, list(zip(first, second)))}
+        bounds = {}
+        if resamples:
+            replicates = bootstrap_correlations(data, dense, resamples, [*np.atleast_1d(seed), block])
+            for method, samples in replicates.items():
+                bounds[method] = interval(samples[:, first, second], confidence)
+        i, j = np.array(pairs).T
+        for method in METHODS:
+            estimate, count, low, high = results[method]
+            for target in [(i, j), (j, i)]:
+                estimate[target] = estimates[method]
+                count[target] = rows.sum()
+                if method in bounds:
+                    low[target], high[target] = bounds[method]
+    return results
+
+# === Entry point ===
+def main():
+    parser = argparse.ArgumentParser(description="Pearson, Spearman and Kendall correlation matrices of every metric.")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES, help="Bootstrap resamples for the intervals (default 0: none; 1000 add about 20 s)")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    table = load_results()
+    rows, timings = [], []
+    for d, dataset in enumerate(DATASETS):
+        for m, model in enumerate(MODELS):
+            values = np.column_stack([table[metric][table.select(model, dataset)] for metric in VALUE_COLUMNS])
+            started = time.perf_counter()
+            matrices = correlation_matrices(values, args.resamples, [args.seed, d, m], args.confidence)
+            timings.append(time.perf_counter() - started)
+            for method, (estimate, count, low, high) in matrices.items():
+                for i, j in zip(*np.triu_indices(len(VALUE_COLUMNS), k=1)):
+                    rows.append({"Dataset": dataset, "Model": MODEL_LABELS[model], "Method": method,
+                                 "Metric A": VALUE_COLUMNS[i], "Metric B": VALUE_COLUMNS[j], "N": count[i, j],
+                                 "Correlation": estimate[i, j], "CI Low": low[i, j], "CI High": high[i, j]})
+    results = pd.DataFrame(rows)
+    results["N"] = results["N"].astype("Int64")
+    results.to_csv(OUTPUT, index=False, float_format="%.4f")
+
+    print(f"{len(VALUE_COLUMNS)} metrics, {len(table)} pairs: {sum(timings):.2f} s "
+          f"({args.resamples} resamples, slowest group {max(timings):.2f} s)")
+    spearman = results[(results["Method"] == "Spearman") & results["Metric A"].isin(FOCUS) & results["Metric B"].isin(FOCUS)]
+    print("Spearman, mean over (dataset, model):")
+    print(spearman.groupby(["Metric A", "Metric B"], sort=False)["Correlation"].mean().unstack().round(3).fillna("").to_string())
+    print(f"- {OUTPUT.name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from results_store import load_results, RESULTS_DIR, MODELS, DATASETS, VALUE_COLUMNS
+
+# === Configuration ===
+SKETCH_PATH = RESULTS_DIR / "metric_sketches.json"
+K = 200
+SHRINK = 2 / 3
+THRESHOLD = 0.5
+SEED = 42
+
+def rank_error(k=K):
+    """Normalized rank error of a KLL sketch answering one quantile, at 99% confidence.
+
+    Empirical fit published with the Apache DataSketches KLL sketch: about 1.3% at
+    k=200, i.e. the value returned for q lies between the exact (q - e) and
+    (q + e) quantiles. It does not depend on the number of records.
+    """
+    return 2.296 / k ** 0.9723
+
+# === KLL sketch ===
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Level h holds items of weight 2**h. When the sketch is over capacity the lowest
+    full level is sorted and every other item (random offset) moves one level up,
+    so memory stays O(k) whatever the number of records. Count, sum, min, max and
+    the count below THRESHOLD are kept exactly.
+    """
+
+    def __init__(self, k=K, rng=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.total = 0.0
+        self.below = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.rng = rng or np.random.default_rng(SEED)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * SHRINK ** depth)))
+
+    def update(self, values):
+        """Add an array of values (NaN ignored)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.below += int(np.count_nonzero(values < THRESHOLD))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+
+    def compress(self):
+        while sum(len(items) for items in self.levels) > sum(self.capacity(h) for h in range(len(self.levels))):
+            level = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self.capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays at its level
+            keep, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[self.rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def merge(self, other):
+        """Fold another sketch (another shard or worker) into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.total += other.total
+        self.below += other.below
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate quantiles, within rank_error(k) of the exact ones."""
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks, side="left"), len(items) - 1)]
+
+    def summary(self):
+        q1, median, q3 = self.quantiles([0.25, 0.5, 0.75])
+        return {
+            "Count": self.count, "Min": self.min, "Q1": float(q1), "Median": float(median), "Q3": float(q3),
+            "Max": self.max, "Mean": self.total / self.count if self.count else np.nan,
+            "<0.5 %": 100 * self.below / self.count if self.count else np.nan
+        }
+
+    def to_dict(self):
+        return {"k": self.k, "count": self.count, "total": self.total, "below": self.below,
+                "min": self.min, "max": self.max, "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data["levels"]]
+        sketch.count, sketch.total, sketch.below = data["count"], data["total"], data["below"]
+        sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+# === Sketch file ===
+class SketchSet:
+    """Sketches per (dataset, model, metric), plus how far each ingested source file was read.
+
+    Appending records to a scored .jsonl and ingesting it again only adds the new
+    lines; SketchSets built on different shards or machines combine with `merge`.
+    """
+
+    def __init__(self, k=K):
+        self.k = k
+        self.sketches = {}
+        self.positions = {}
+
+    @staticmethod
+    def key(dataset, model, metric):
+        return f"{dataset}|{model}|{metric}"
+
+    def sketch(self, dataset, model, metric):
+        key = self.key(dataset, model, metric)
+        if key not in self.sketches:
+            self.sketches[key] = KLLSketch(self.k)
+        return self.sketches[key]
+
+    def add_records(self, records, dataset, model):
+        for metric in VALUE_COLUMNS:
+            values = [record[metric] for record in records if record.get(metric) is not None]
+            if values:
+                self.sketch(dataset, model, metric).update(values)
+
+    def ingest(self, path, dataset, model):
+        """Add the records of a metrics .json (array) or scored .jsonl file appended since the last ingest."""
+        path = Path(path)
+        source = str(path.resolve())
+        position = self.positions.get(source, 0)
+        if path.suffix == ".jsonl":
+            with open(path, "rb") as f:
+                f.seek(position)
+                lines = f.readlines()
+            complete = [line for line in lines if line.endswith(b"\n")]
+            records = [json.loads(line) for line in complete if line.strip()]
+            self.positions[source] = position + sum(len(line) for line in complete)
+        else:
+            with open(path, "r") as f:
+                records = json.load(f)[position:]
+            self.positions[source] = position + len(records)
+        self.add_records(records, dataset, model)
+        return len(records)
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = sketch
+        for source, position in other.positions.items():
+            self.positions[source] = max(position, self.positions.get(source, 0))
+        return self
+
+    def combined(self, dataset=None, model=None, metric=None):
+        """One sketch merging every (dataset, model, metric) that matches the given filters."""
+        result = KLLSketch(self.k)
+        for key, sketch in self.sketches.items():
+            d, m, name = key.split("|")
+            if dataset in (None, d) and model in (None, m) and metric in (None, name):
+                result.merge(sketch)
+        return result
+
+    def save(self, path=SKETCH_PATH):
+        with open(path, "w") as f:
+            json.dump({"k": self.k, "rank_error": rank_error(self.k), "positions": self.positions,
+                       "sketches": {key: sketch.to_dict() for key, sketch in sorted(self.sketches.items())}}, f)
+
+    @classmethod
+    def load(cls, path=SKETCH_PATH):
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        with open(path, "r") as f:
+            data = json.load(f)
+        sketches = cls(data["k"])
+        sketches.positions = data["positions"]
+        sketches.sketches = {key: KLLSketch.from_dict(value) for key, value in data["sketches"].items()}
+        return sketches
+
+# === Entry point ===
+def build_from_store(k=K):
+    """Sketches of every metric of the results store, one (dataset, model) slice at a time."""
+    table = load_results()
+    sketches = SketchSet(k)
+    for model in MODELS:
+        for dataset in DATASETS:
+            mask = table.select(model, dataset)
+            for metric in VALUE_COLUMNS:
+                sketches.sketch(dataset, model, metric).update(table[metric][mask])
+    return sketches
+
+def print_summary(sketches, metrics):
+    error = rank_error(sketches.k)
+    print(f"Quantiles within +/-{100 * error:.2f}% in rank (99% confidence)")
+    for key in sorted(sketches.sketches):
+        dataset, model, metric = key.split("|")
+        if metrics and metric not in metrics:
+            continue
+        s = sketches.sketches[key].summary()
+        print(f"  {dataset:10s} {model:8s} {metric:22s} n={s['Count']:6d} Q1={s['Q1']:.4f} "
+              f"Median={s['Median']:.4f} Q3={s['Q3']:.4f} Mean={s['Mean']:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mergeable quantile sketches of the per-pair metrics.")
+    parser.add_argument("--sketches", default=str(SKETCH_PATH))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the sketches from the results store")
+    ingest = subparsers.add_parser("ingest", help="Add records appended to metrics files since the last ingest")
+    ingest.add_argument("dataset", choices=DATASETS)
+    ingest.add_argument("model", choices=MODELS)
+    ingest.add_argument("files", nargs="+")
+    merge = subparsers.add_parser("merge", help="Merge sketch files of other shards or workers")
+    merge.add_argument("files", nargs="+")
+    summary = subparsers.add_parser("summary", help="Print Q1 / median / Q3 of every sketch")
+    summary.add_argument("metrics", nargs="*")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        print_summary(SketchSet.load(args.sketches), args.metrics)
+        return
+    if args.command == "build":
+        sketches = build_from_store()
+    elif args.command == "ingest":
+        sketches = SketchSet.load(args.sketches)
+        for path in args.files:
+            print(f"[SKETCH] {sketches.ingest(path, args.dataset, args.model)} new records from {path}")
+    else:
+        sketches = SketchSet.load(args.sketches)
+        for path in args.files:
+            sketches.merge(SketchSet.load(path))
+    sketches.save(args.sketches)
+    print(f"[SKETCH] {len(sketches.sketches)} sketches -> {args.sketches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import re
+import sys
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# === Configuration ===
+RESULTS_DIR = Path(__file__).resolve().parent
+METRICS_DIR = RESULTS_DIR / "CODEBLEU-METEOR-ROUGEL-ETC"
+SIMILARITY_DIR = RESULTS_DIR / "COSINE-SIMILARITY-CODEBERT-GRAPHCODEBERT-OPENAIEMBEDDINGS"
+STORE_PATH = RESULTS_DIR / "results_store.npz"
+
+METRICS_PATTERN = re.compile(r"(GPT|MISTRAL)-UPDATED_(Defects4J|SF110)-Scenario-1-metrics\.json")
+# Model tags are matched through MODEL_ALIASES, so misspelled file names such as ...-GTP.json are not skipped
+SIMILARITY_PATTERN = re.compile(
+    r"(Defects4J|SF110)-Scenario-1-similarity-(CODEBERT|GRAPHCODEBERT|OPENAI)-(\w+)\.json", re.IGNORECASE
+)
+MODEL_ALIASES = {"GPT": "GPT", "GTP": "GPT", "MISTRAL": "MISTRAL"}
+
+MODELS = ["GPT", "MISTRAL"]
+DATASETS = ["Defects4J", "SF110"]
+MODEL_LABELS = {"GPT": "GPT 4-o", "MISTRAL": "Mistral large-2407"}
+EMBEDDINGS = {"CODEBERT": "CodeBERT", "GRAPHCODEBERT": "GraphCodeBERT", "OPENAI": "OpenAI"}
+
+KEY_COLUMNS = ["project_name", "class", "bug-id", "fqdn", "iteration_evosuite", "iteration_refactored"]
+SIMILARITY_METRICS = [
+    "METEOR", "ROUGE-L", "CodeBLEU", "N-gram Match",
+    "Weighted N-gram Match", "Syntax Match", "Dataflow Match"
+]
+CTSES_METRICS = ["average_score_1", "CTSES_score_1", "CTSES_score_2"]
+COSINE_METRICS = [f"cosine_{label}" for label in EMBEDDINGS.values()]
+VALUE_COLUMNS = SIMILARITY_METRICS + CTSES_METRICS + COSINE_METRICS
+
+# === Sources ===
+def source_files():
+    """[(path, model, dataset, embedding)] of every result file; embedding is None for the lexical metrics."""
+    sources = []
+    for path in sorted(METRICS_DIR.glob("*.json")):
+        match = METRICS_PATTERN.fullmatch(path.name)
+        if match:
+            sources.append((path, match.group(1), match.group(2), None))
+    for path in sorted(SIMILARITY_DIR.glob("*.json")):
+        match = SIMILARITY_PATTERN.fullmatch(path.name)
+        if not match:
+            continue
+        dataset, embedding, model = match.groups()
+        if model.upper() not in MODEL_ALIASES:
+            print(f"[RESULTS] Unknown model tag in {path.name}, file skipped")
+            continue
+        sources.append((path, MODEL_ALIASES[model.upper()], dataset, EMBEDDINGS[embedding.upper()]))
+    return sources
+
+def fingerprint(sources):
+    digest = hashlib.sha1()
+    for path, *_ in sources:
+        digest.update(path.name.encode("utf-8"))
+        digest.update(hashlib.sha1(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+def read_frame(path, model, dataset, embedding):
+    with open(path, "r") as f:
+        frame = pd.DataFrame(json.load(f))
+    frame["bug-id"] = frame["bug-id"].astype(object).where(frame["bug-id"].notna(), "")
+    frame[KEY_COLUMNS] = frame[KEY_COLUMNS].astype(str)
+    frame["model"], frame["dataset"] = model, dataset
+    if embedding is not None:
+        frame = frame[KEY_COLUMNS + ["model", "dataset", "cosine_similarity"]]
+        frame = frame.rename(columns={"cosine_similarity": f"cosine_{embedding}"})
+    return frame.drop_duplicates(["model", "dataset"] + KEY_COLUMNS, keep="last")
+
+# === Build ===
+def build_store(path=STORE_PATH):
+    """Join the lexical metrics and the three embedding similarities of every pair into one column table.
+
+    Each (model, dataset, pair) becomes one row; a metric missing for a pair (e.g. an
+    embedding file covering fewer pairs) is NaN. Model and dataset are dictionary
+    encoded (uint8 codes into the `model_values` / `dataset_values` columns), the
+    identifiers are fixed-width strings and every metric is a float64 column.
+    """
+    sources = source_files()
+    on = ["model", "dataset"] + KEY_COLUMNS
+    lexical = pd.concat([read_frame(*source) for source in sources if source[3] is None], ignore_index=True)
+    table = lexical
+    for embedding in EMBEDDINGS.values():
+        frames = [read_frame(*source) for source in sources if source[3] == embedding]
+        if frames:
+            table = table.merge(pd.concat(frames, ignore_index=True), on=on, how="outer")
+    table = table.sort_values(on, kind="stable").reset_index(drop=True)
+
+    columns = {
+        "model": np.array([MODELS.index(m) for m in table["model"]], dtype=np.uint8),
+        "model_values": np.array(MODELS),
+        "dataset": np.array([DATASETS.index(d) for d in table["dataset"]], dtype=np.uint8),
+        "dataset_values": np.array(DATASETS),
+        "sources": np.array([fingerprint(sources)])
+    }
+    for column in KEY_COLUMNS:
+        columns[column] = table[column].to_numpy(dtype=str)
+    for column in VALUE_COLUMNS:
+        columns[column] = table[column].to_numpy(dtype=np.float64) if column in table else np.full(len(table), np.nan)
+    np.savez_compressed(path, **columns)
+    print(f"[RESULTS] {len(table)} pairs from {len(sources)} files -> {path}")
+    return path
+
+# === Access ===
+class ResultsTable:
+    """Column arrays of the results store; `select` and `labels` work on the encoded columns directly."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["model"])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def labels(self, column):
+        """Decoded values of a dictionary-encoded column ("model" or "dataset")."""
+        return self.columns[f"{column}_values"][self.columns[column]]
+
+    def select(self, model=None, dataset=None):
+        """Boolean row mask for a model and/or dataset."""
+        mask = np.ones(len(self), dtype=bool)
+        if model is not None:
+            mask &= self.columns["model"] == MODELS.index(model)
+        if dataset is not None:
+            mask &= self.columns["dataset"] == DATASETS.index(dataset)
+        return mask
+
+    def to_frame(self, columns=None):
+        """pandas view of the table with readable Model and Dataset columns."""
+        frame = pd.DataFrame({column: self.columns[column] for column in columns or KEY_COLUMNS + VALUE_COLUMNS})
+        frame.insert(0, "Model", [MODEL_LABELS[m] for m in self.labels("model")])
+        frame.insert(1, "Dataset", self.labels("dataset"))
+        return frame
+
+def load_results(path=STORE_PATH, rebuild=False):
+    """Open the results store, rebuilding it first if it is missing or a result file changed."""
+    path = Path(path)
+    if rebuild or not path.exists():
+        build_store(path)
+    with np.load(path, allow_pickle=False) as data:
+        columns = {name: data[name] for name in data.files}
+    if path == STORE_PATH and str(columns["sources"][0]) != fingerprint(source_files()):
+        return load_results(path, rebuild=True)
+    return ResultsTable(columns)
+
+def main():
+    table = load_results(rebuild="--rebuild" in sys.argv)
+    for model in MODELS:
+        for dataset in DATASETS:
+            mask = table.select(model, dataset)
+            counts = ", ".join(f"{column} {np.count_nonzero(~np.isnan(table[column][mask]))}"
+                               for column in ["CodeBLEU"] + COSINE_METRICS)
+            print(f"  {model:8s} {dataset:10s} {np.count_nonzero(mask):6d} pairs ({counts})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from results_store import (load_results, RESULTS_DIR, MODELS, DATASETS, MODEL_LABELS,
+                           SIMILARITY_METRICS, CTSES_METRICS, COSINE_METRICS)
+
+# === Configuration ===
+QUANTILES = {"Q1": 0.25, "Median": 0.5, "Q3": 0.75}
+THRESHOLD = 0.5
+STAT_COLUMNS = ["Min", "Q1", "Median", "Q3", "Max", "Mean", "<0.5 %", ">=0.5 %"]
+# Grouping levels: the identifier columns each level keeps ("All" elsewhere)
+LEVELS = {
+    "global": (),
+    "dataset": ("dataset",),
+    "model": ("model",),
+    "dataset_model": ("dataset", "model")
+}
+# Recomputed counterparts of the published statistics files, which are left as committed: those were
+# computed from unrounded scores, the store holds the 4-decimal per-pair values
+OUTPUT_DIR = RESULTS_DIR / "stats_engine_outputs"
+STATS_METRICS = ["METEOR", "ROUGE-L", "CodeBLEU"] + CTSES_METRICS
+SUMMARY_DECIMALS = 2
+
+# === Engine ===
+def lerp(low, high, fraction):
+    """Linear interpolation computed as np.percentile does, so results match it exactly."""
+    return np.where(fraction >= 0.5, high - (high - low) * (1 - fraction), low + (high - low) * fraction)
+
+def grouped_stats(values, groups, num_groups, quantiles=QUANTILES, threshold=THRESHOLD):
+    """Count, Min, quantiles, Max, Mean and threshold shares of `values` for each group code.
+
+    NaN values are ignored. All groups are sorted together once (by group, then
+    value), after which every statistic is read from the sorted array with index
+    arithmetic: quantiles interpolate between neighbours as np.percentile does,
+    sums and threshold counts come from np.bincount. Empty groups get NaN.
+    """
+    keep = ~np.isnan(values)
+    values, groups = values[keep], groups[keep]
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+
+    counts = np.bincount(groups, minlength=num_groups)
+    starts = np.cumsum(counts) - counts
+    last = np.maximum(starts + counts - 1, 0)
+    present = counts > 0
+    safe_counts = np.where(present, counts, 1)
+
+    def at(index):
+        return np.where(present, values[np.minimum(index, len(values) - 1)] if len(values) else np.nan, np.nan)
+
+    stats = {"Count": counts, "Min": at(starts)}
+    for name, q in quantiles.items():
+        position = q * (safe_counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, safe_counts - 1)
+        stats[name] = np.where(present, lerp(at(starts + low), at(starts + high), position - low), np.nan)
+    stats["Max"] = at(last)
+    stats["Mean"] = np.where(present, np.bincount(groups, weights=values, minlength=num_groups) / safe_counts, np.nan)
+    below = np.bincount(groups, weights=values < threshold, minlength=num_groups)
+    stats[f"<{threshold} %"] = np.where(present, 100 * below / safe_counts, np.nan)
+    stats[f">={threshold} %"] = np.where(present, 100 * (counts - below) / safe_counts, np.nan)
+    return stats
+
+def compute_stats(table, metrics, levels=LEVELS):
+    """Statistics of every metric at every grouping level, from a single grouped sort.
+
+    Returns one long frame with Level, Dataset, Model, Metric and the statistic
+    columns; Dataset / Model are "All" at levels that do not group by them.
+    """
+    num_datasets, num_models, num_metrics = len(DATASETS) + 1, len(MODELS) + 1, len(metrics)
+    rows = len(table)
+    metric_codes = np.repeat(np.arange(num_metrics), rows)
+    values, groups = [], []
+    for level, (name, keys) in enumerate(levels.items()):
+        dataset = table["dataset"].astype(np.int64) if "dataset" in keys else np.full(rows, len(DATASETS))
+        model = table["model"].astype(np.int64) if "model" in keys else np.full(rows, len(MODELS))
+        base = ((level * num_datasets + dataset) * num_models + model) * num_metrics
+        values.append(np.concatenate([table[metric] for metric in metrics]))
+        groups.append(np.tile(base, num_metrics) + metric_codes)
+    num_groups = len(levels) * num_datasets * num_models * num_metrics
+    stats = grouped_stats(np.concatenate(values), np.concatenate(groups), num_groups)
+
+    codes = np.arange(num_groups)
+    level, rest = np.divmod(codes, num_datasets * num_models * num_metrics)
+    dataset, rest = np.divmod(rest, num_models * num_metrics)
+    model, metric = np.divmod(rest, num_metrics)
+    frame = pd.DataFrame({
+        "Level": np.array(list(levels))[level],
+        "Dataset": np.array(DATASETS + ["All"])[dataset],
+        "Model": np.array([MODEL_LABELS[m] for m in MODELS] + ["All"])[model],
+        "Metric": np.array(metrics)[metric],
+        **stats
+    })
+    return frame[frame["Count"] > 0].reset_index(drop=True)
+
+# === Exports ===
+def select(stats, level, metrics, columns):
+    """Rows of one level, metric-major in the order of `metrics`, then by the level's keys."""
+    frame = stats[(stats["Level"] == level) & stats["Metric"].isin(metrics)].copy()
+    frame["order"] = frame["Metric"].map({metric: i for i, metric in enumerate(metrics)})
+    return frame.sort_values(["order", "Dataset", "Model"], kind="stable")[columns].reset_index(drop=True)
+
+def export_csv(frame, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_csv(path, index=False)
+    print(f"- {path.relative_to(RESULTS_DIR)}")
+
+def export_lexical(stats):
+    """As ctses_stats_outputs/: per (dataset, model) and global statistics of the lexical metrics and CTSES scores."""
+    columns = ["Min", "Q1", "Median", "Q3", "Max", "Mean"]
+    for name, metrics in (("similarity_metrics", SIMILARITY_METRICS), ("ctses_scores", CTSES_METRICS)):
+        export_csv(select(stats, "dataset_model", metrics, ["Dataset", "Model", "Metric"] + columns),
+                   OUTPUT_DIR / f"stats_{name}.csv")
+        export_csv(select(stats, "global", metrics, ["Metric"] + columns), OUTPUT_DIR / f"global_stats_{name}.csv")
+
+def export_cosine(stats):
+    """As cosine_similarity_outputs/: per (dataset, model, embedding) and per embedding statistics."""
+    columns = ["Min", "Q1", "Median", "Q3", "Max", "Mean"]
+    frame = stats[stats["Metric"].isin(COSINE_METRICS)].copy()
+    frame["Embedding"] = frame["Metric"].str.replace("cosine_", "", regex=False)
+    detailed = frame[frame["Level"] == "dataset_model"].sort_values(["Dataset", "Model", "Embedding"])
+    overall = frame[frame["Level"] == "global"].sort_values("Embedding")
+    export_csv(detailed[["Dataset", "Model", "Embedding"] + columns], OUTPUT_DIR / "cosine_similarity_stats_detailed.csv")
+    export_csv(overall[["Embedding"] + columns], OUTPUT_DIR / "cosine_similarity_stats_global.csv")
+
+def export_summaries(stats):
+    """As STATS-AVERAGE-CTSES-1-CTSES-2/: per model and dataset JSON files, their synthesis and the per-dataset average."""
+    frame = select(stats, "dataset_model", STATS_METRICS, ["Dataset", "Model", "Metric"] + STAT_COLUMNS)
+    labels = {label: model for model, label in MODEL_LABELS.items()}
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    for (dataset, model), group in frame.groupby(["Dataset", "Model"], sort=False):
+        summary = {
+            row["Metric"]: {column: round(float(row[column]), 2 if "%" in column else 4) for column in STAT_COLUMNS}
+            for _, row in group.iterrows()
+        }
+        path = OUTPUT_DIR / f"{labels[model]}-STATS_{dataset}-Scenario-1-metrics.json"
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=4)
+        print(f"- {path.relative_to(RESULTS_DIR)}")
+
+    frame = frame.sort_values(["Dataset", "Model"], kind="stable")
+    frame[STAT_COLUMNS] = frame[STAT_COLUMNS].round(SUMMARY_DECIMALS)
+    export_csv(frame, OUTPUT_DIR / "summary_stats_ctses_all_models.csv")
+    # As before: the per-model statistics averaged over the models of each dataset
+    aggregated = frame.groupby(["Dataset", "Metric"])[STAT_COLUMNS].mean().reset_index()
+    aggregated[STAT_COLUMNS] = aggregated[STAT_COLUMNS].round(SUMMARY_DECIMALS)
+    export_csv(aggregated, OUTPUT_DIR / "summary_stats_ctses_aggregated_by_dataset.csv")
+
+def main():
+    table = load_results()
+    stats = compute_stats(table, SIMILARITY_METRICS + CTSES_METRICS + COSINE_METRICS)
+    print(f"Computed {len(stats)} group statistics over {len(table)} pairs")
+    export_lexical(stats)
+    export_cosine(stats)
+    export_summaries(stats)
+    export_csv(stats, RESULTS_DIR / "stats_all_levels.csv")
+
+if __name__ == "__main__":
+    main()